@@ -0,0 +1,259 @@
+"""Benchmarks for the team builder and simulation hot paths.
+
+Micro-benchmarks call the functions in main.py directly on synthetic pools;
+the load test drives the ASGI app in-process (no server, no HTTP client) and
+reports latency percentiles and throughput. Results are written as JSON so
+runs from different commits can be compared. The island section runs the
+parallel split search at a fixed wall-clock budget for each worker count, to
+show how solution quality scales with cores:
+
+    python bench.py --out before.json
+    python bench.py --out after.json --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Keep benchmark runs away from the real stats database
+os.environ.setdefault("FOOTBOT_DB", os.path.join(tempfile.mkdtemp(prefix="footbot-bench-"), "bench.db"))
+
+import numpy as np
+
+import main
+
+# (players, teams) pairs spanning the supported range
+SIZES = [(10, 2), (100, 8), (1000, 32), (10000, 256)]
+ISLAND_SIZES = [(1000, 32), (10000, 256)]
+
+
+def make_players(n, rng):
+    levels = list(main.score_map)
+    return [{"name": f"P{i}", "position": rng.choice(main.positions), "level": rng.choice(levels)} for i in range(n)]
+
+
+def make_teams(players, team_count):
+    teams = [{"players": [], "name": f"Team {t + 1}"} for t in range(team_count)]
+    for i, p in enumerate(players):
+        teams[i % team_count]["players"].append(p)
+    return teams
+
+
+def timed(fn, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - t0)
+    return samples, result
+
+
+def summarise(samples):
+    return {"min_ms": min(samples) * 1e3, "median_ms": statistics.median(samples) * 1e3, "runs": len(samples)}
+
+
+def micro(sizes, repeat, generations, seed):
+    rows = []
+    for n, team_count in sizes:
+        rng = random.Random(seed)
+        players = make_players(n, rng)
+        teams = make_teams(players, team_count)
+        split = [t["players"] for t in teams]
+        formation = main.parse_formation("custom", max(5, n // team_count))
+
+        def record(name, fn, **extra):
+            samples, result = timed(fn, repeat)
+            row = {"bench": name, "players": n, "teams": team_count, **summarise(samples), **extra}
+            if name == "genetic_multi_split":
+                row["fitness"] = main.fitness_formation(result)
+            rows.append(row)
+            print(f"{name:36s} n={n:<6d} teams={team_count:<4d} median={row['median_ms']:.3f}ms", file=sys.stderr)
+
+        record("fitness_formation", lambda: main.fitness_formation(split))
+        pool = main.PlayerPool(players)
+        population = np.array([[i % team_count for i in rng.sample(range(n), n)] for _ in range(64)])
+        record("fitness_formation_batch[64]", lambda: main.fitness_formation_batch(population, pool.rating, pool.pos, team_count))
+        record("genetic_multi_split", lambda: main.genetic_multi_split(players, team_count, generations=generations, rng=random.Random(seed)),
+               generations=generations)
+        record("enforce_formation_and_build_teams",
+               lambda: main.enforce_formation_and_build_teams(players, team_count, formation, max(5, n // team_count), rng=random.Random(seed)))
+        record("simulate_match", lambda: main.simulate_match(teams[0], teams[1], rng=random.Random(seed)))
+        record("generate_knockout", lambda: main.generate_knockout(teams, random.Random(seed)))
+        record("create_schedule_list", lambda: main.create_schedule_list(teams))
+    return rows
+
+
+def islands(sizes, workers, budget_ms, seed):
+    # Fractional ratings so the split has room to improve beyond the position floor
+    rows = []
+    for n, team_count in sizes:
+        rng = random.Random(seed)
+        players = [dict(p, rating=round(rng.uniform(0.5, 3.5), 3)) for p in make_players(n, rng)]
+        pool = main.PlayerPool(players)
+        for w in workers:
+            main.ISLAND_WORKERS = w
+            stats = {}
+            t0 = time.perf_counter()
+            main.optimise_split_islands(pool, team_count, w, rng=random.Random(seed), time_budget=budget_ms / 1000.0, stats=stats)
+            row = {"bench": "islands", "players": n, "teams": team_count, "workers": w, "budget_ms": budget_ms,
+                   "wall_ms": (time.perf_counter() - t0) * 1e3, "fitness": stats["final_fitness"], "steps": stats["steps"]}
+            rows.append(row)
+            print(f"islands n={n:<6d} teams={team_count:<4d} workers={w:<3d} fitness={row['fitness']:.3f} steps={row['steps']}", file=sys.stderr)
+    return rows
+
+
+async def asgi_request(app, path, payload):
+    # Minimal ASGI round trip: one http.request in, collect the response
+    body = json.dumps(payload).encode("utf-8")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 0), "server": ("127.0.0.1", 80),
+    }
+    sent = False
+    status = None
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.sleep(3600)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await main.app(scope, receive, send)
+    return status
+
+
+async def load(path, payloads, requests, concurrency):
+    latencies = []
+    statuses = {}
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(payloads[i % len(payloads)])
+
+    async def worker():
+        while True:
+            try:
+                payload = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            t0 = time.perf_counter()
+            status = await asgi_request(main.app, path, payload)
+            latencies.append(time.perf_counter() - t0)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    wall = time.perf_counter() - t0
+    pct = np.percentile(np.array(latencies) * 1e3, [50, 95, 99]).tolist()
+    return {"route": path, "requests": requests, "concurrency": concurrency, "wall_s": wall,
+            "throughput_rps": requests / wall, "p50_ms": pct[0], "p95_ms": pct[1], "p99_ms": pct[2],
+            "statuses": {str(k): v for k, v in statuses.items()}}
+
+
+def load_tests(requests, concurrency, seed):
+    rng = random.Random(seed)
+    rows = []
+    generate_payloads = [{"players": make_players(n, rng), "teamCount": t, "tournamentType": tt}
+                         for n, t in [(20, 2), (100, 8)] for tt in ("round-robin", "knockout")]
+    players = make_players(40, rng)
+    teams = make_teams(players, 4)
+    simulate_payloads = [{"teamA": a, "teamB": b, "teams": teams} for a in range(4) for b in range(4) if a != b]
+
+    async def run():
+        for path, payloads in (("/generate", generate_payloads), ("/simulate", simulate_payloads)):
+            row = await load(path, payloads, requests, concurrency)
+            rows.append(row)
+            print(f"load {path:12s} p50={row['p50_ms']:.2f}ms p95={row['p95_ms']:.2f}ms p99={row['p99_ms']:.2f}ms "
+                  f"{row['throughput_rps']:.1f} req/s", file=sys.stderr)
+
+    asyncio.run(run())
+    return rows
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    old = {(r["bench"], r["players"], r["teams"]): r for r in baseline.get("micro", [])}
+    for r in current["micro"]:
+        prev = old.get((r["bench"], r["players"], r["teams"]))
+        if prev and prev["median_ms"] > 0:
+            ratio = r["median_ms"] / prev["median_ms"]
+            flag = "  REGRESSION" if ratio > 1.1 else ""
+            print(f"{r['bench']:36s} n={r['players']:<6d} {prev['median_ms']:.3f}ms -> {r['median_ms']:.3f}ms ({ratio:.2f}x){flag}", file=sys.stderr)
+    old_islands = {(r["players"], r["teams"], r["workers"]): r for r in baseline.get("islands", [])}
+    for r in current["islands"]:
+        prev = old_islands.get((r["players"], r["teams"], r["workers"]))
+        if prev:
+            print(f"islands n={r['players']:<6d} workers={r['workers']:<3d} fitness {prev['fitness']:.3f} -> {r['fitness']:.3f}", file=sys.stderr)
+    old_load = {r["route"]: r for r in baseline.get("load", [])}
+    for r in current["load"]:
+        prev = old_load.get(r["route"])
+        if prev:
+            print(f"load {r['route']:12s} p95 {prev['p95_ms']:.2f}ms -> {r['p95_ms']:.2f}ms, "
+                  f"{prev['throughput_rps']:.1f} -> {r['throughput_rps']:.1f} req/s", file=sys.stderr)
+
+
+def parse_sizes(text):
+    return [tuple(int(x) for x in part.split("x")) for part in text.split(",")]
+
+
+def parse_ints(text):
+    return [int(x) for x in text.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=parse_sizes, default=SIZES, help="comma separated PLAYERSxTEAMS, e.g. 10x2,1000x32")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--generations", type=int, default=300, help="genetic_multi_split budget")
+    parser.add_argument("--requests", type=int, default=200, help="requests per route in the load test")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--skip-load", action="store_true")
+    parser.add_argument("--island-sizes", type=parse_sizes, default=ISLAND_SIZES)
+    parser.add_argument("--island-workers", type=parse_ints, default=[1, 2, 4, 8], help="comma separated worker counts")
+    parser.add_argument("--island-budget-ms", type=float, default=1000, help="wall-clock budget per island run")
+    parser.add_argument("--skip-islands", action="store_true")
+    parser.add_argument("--out", help="write JSON results here (default: stdout)")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    args = parser.parse_args()
+
+    results = {
+        "meta": {"commit": git_commit(), "python": platform.python_version(), "numpy": np.__version__,
+                 "cpus": os.cpu_count(), "timestamp": time.time(), "seed": args.seed},
+        "micro": micro(args.sizes, args.repeat, args.generations, args.seed),
+        "islands": [] if args.skip_islands else islands(args.island_sizes, args.island_workers, args.island_budget_ms, args.seed),
+        "load": [] if args.skip_load else load_tests(args.requests, args.concurrency, args.seed),
+    }
+    text = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        compare(results, args.compare)
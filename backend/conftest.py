@@ -0,0 +1,2 @@
+# test_post.py is a manual smoke script against a running server
+collect_ignore = ["test_post.py"]
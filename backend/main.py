@@ -1,11 +1,35 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from collections import defaultdict
-from typing import List, Dict, Optional, Any
+from fastapi.middleware.gzip import GZipMiddleware
+from collections import OrderedDict
+from typing import List, Dict, Optional, Any, Tuple, Callable, Awaitable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import bisect
+import functools
+import hashlib
+import multiprocessing
+import heapq
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import uuid
 import traceback
 import random
 import math
 
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # optional: faster JSON encode/decode
+    orjson = None
+
 
 app = FastAPI()
 
@@ -16,13 +40,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress responses above this size when the client accepts gzip
+GZIP_MIN_BYTES = int(os.environ.get("FOOTBOT_GZIP_MIN_BYTES", 1024))
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_BYTES, compresslevel=5)
+
+# Process pools start their workers from a fork server rather than forking
+# this threaded server: a child forked while another thread held a lock
+# would inherit it locked. The server imports this module once, so each
+# worker is a cheap fork of that instead of a fresh interpreter.
+POOL_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+if POOL_CONTEXT.get_start_method() == "forkserver" and __name__ != "__main__":
+    POOL_CONTEXT.set_forkserver_preload([__name__])
+
 
 # basic level -> numeric score
 score_map = {"Beginner": 1, "Intermediate": 2, "Advanced": 3}
 positions = ["Goalkeeper", "Defender", "Midfielder", "Forward"]
-
-# In-memory player stats store (ready to be replaced by DB)
-player_stats = defaultdict(lambda: {"goals": 0, "assists": 0, "appearances": 0, "rating": 0.0})
+pos_index = {pos: i for i, pos in enumerate(positions)}
 
 # Common formations
 formations = {
@@ -31,6 +66,193 @@ formations = {
     "3-5-2": {"Goalkeeper": 1, "Defender": 3, "Midfielder": 5, "Forward": 2},
 }
 
+# Upper bound on Monte Carlo replays per /simulate call
+MAX_SIM_ITERATIONS = 1_000_000
+# Upper bound on fixtures x iterations for one /simulate/batch call
+MAX_BATCH_SIMULATIONS = 5_000_000
+
+
+# Persistent player stats (SQLite). Ratings are kept on an Elo scale and
+# folded into player_rating as an offset from the player's level score.
+STATS_DB_PATH = os.environ.get("FOOTBOT_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "footbot.db"))
+STATS_CACHE_TTL = 30.0
+STATS_CACHE_SIZE = 50_000
+ELO_BASE = 1500.0
+ELO_K = 24.0
+# Elo points worth one level step (Beginner -> Intermediate)
+ELO_PER_LEVEL = 400.0
+
+
+class StatsStore:
+    # One connection per thread (and per process, so forked pool workers do
+    # not inherit the parent's handle).
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS players (
+                    player_id TEXT PRIMARY KEY,
+                    elo REAL NOT NULL DEFAULT 1500,
+                    appearances INTEGER NOT NULL DEFAULT 0,
+                    wins INTEGER NOT NULL DEFAULT 0,
+                    draws INTEGER NOT NULL DEFAULT 0,
+                    losses INTEGER NOT NULL DEFAULT 0,
+                    goals INTEGER NOT NULL DEFAULT 0,
+                    assists INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL DEFAULT 0
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS matches (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    played_at REAL NOT NULL,
+                    source TEXT NOT NULL,
+                    team_a TEXT NOT NULL,
+                    team_b TEXT NOT NULL,
+                    score_a INTEGER NOT NULL,
+                    score_b INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS matches_played_at ON matches (played_at);
+            """)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def load(self, player_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        # One query for the whole pool: the ids go in as a single JSON array
+        if not player_ids:
+            return {}
+        rows = self.conn().execute(
+            "SELECT player_id, elo, appearances, wins, draws, losses, goals, assists FROM players "
+            "WHERE player_id IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(player_ids)),),
+        ).fetchall()
+        keys = ("elo", "appearances", "wins", "draws", "losses", "goals", "assists")
+        return {r[0]: dict(zip(keys, r[1:])) for r in rows}
+
+    def save(self, rows: Dict[str, Dict[str, Any]], matches: List[Tuple[str, str, str, int, int]]) -> None:
+        now = time.time()
+        with self.conn() as conn:
+            conn.executemany(
+                "INSERT INTO players (player_id, elo, appearances, wins, draws, losses, goals, assists, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(player_id) DO UPDATE SET elo = excluded.elo, appearances = excluded.appearances, "
+                "wins = excluded.wins, draws = excluded.draws, losses = excluded.losses, "
+                "goals = excluded.goals, assists = excluded.assists, updated_at = excluded.updated_at",
+                [(pid, s["elo"], s["appearances"], s["wins"], s["draws"], s["losses"], s["goals"], s["assists"], now)
+                 for pid, s in rows.items()],
+            )
+            conn.executemany(
+                "INSERT INTO matches (played_at, source, team_a, team_b, score_a, score_b) VALUES (?, ?, ?, ?, ?, ?)",
+                [(now,) + m for m in matches],
+            )
+
+
+stats_store = StatsStore(STATS_DB_PATH)
+
+# Read-through cache in front of stats_store: player id -> (expires_at, stats or None)
+player_stats: "OrderedDict[str, Tuple[float, Optional[Dict[str, Any]]]]" = OrderedDict()
+_stats_lock = threading.Lock()
+
+
+def player_key(player: Dict[str, Any]) -> str:
+    return str(player.get("id") or player.get("name") or "").strip()
+
+
+def stats_id(player: Dict[str, Any]) -> str:
+    # Stored stats are keyed by explicit ids only: display names collide
+    # across organisers, so a name never picks up someone else's Elo
+    return str(player.get("id") or "").strip()
+
+
+def cache_player_stats(stats: Dict[str, Optional[Dict[str, Any]]]) -> None:
+    expires = time.monotonic() + STATS_CACHE_TTL
+    with _stats_lock:
+        for pid, s in stats.items():
+            player_stats[pid] = (expires, s)
+            player_stats.move_to_end(pid)
+        while len(player_stats) > STATS_CACHE_SIZE:
+            player_stats.popitem(last=False)
+
+
+def cached_player_stats(pid: str) -> Optional[Dict[str, Any]]:
+    entry = player_stats.get(pid)
+    if entry is None or entry[0] < time.monotonic():
+        return None
+    return entry[1]
+
+
+def warm_stats_cache(players: List[Dict[str, Any]]) -> None:
+    # Fetch every uncached player of a request in one bulk query
+    now = time.monotonic()
+    missing = set()
+    for p in players:
+        pid = stats_id(p)
+        if pid:
+            entry = player_stats.get(pid)
+            if entry is None or entry[0] < now:
+                missing.add(pid)
+    if not missing:
+        return
+    try:
+        found = stats_store.load(list(missing))
+    except sqlite3.Error:
+        # Stats are an optional refinement; never fail a request over them
+        return
+    cache_player_stats({pid: found.get(pid) for pid in missing})
+
+
+def record_match_results(matches: List[Dict[str, Any]], source: str = "real") -> Tuple[Dict[str, Dict[str, Any]], int]:
+    # Sequential Elo updates over a batch: one bulk read, one write transaction
+    sides = []
+    for m in matches:
+        teamA = m.get("teamA")
+        teamB = m.get("teamB")
+        score = m.get("result", {}).get("simulated_score") if isinstance(m.get("result"), dict) else None
+        scoreA = int(m["scoreA"] if "scoreA" in m else (score or {}).get("teamA", 0))
+        scoreB = int(m["scoreB"] if "scoreB" in m else (score or {}).get("teamB", 0))
+        ids = []
+        for team in (teamA, teamB):
+            roster = team.get("starters") or team.get("players") or [] if isinstance(team, dict) else team or []
+            ids.append([k for k in (stats_id(p) if isinstance(p, dict) else str(p).strip() for p in roster) if k])
+        sides.append((ids[0], ids[1], scoreA, scoreB, m.get("stats") or {}))
+
+    all_ids = list({pid for a, b, _, _, _ in sides for pid in a + b})
+    rows = stats_store.load(all_ids)
+    for pid in all_ids:
+        rows.setdefault(pid, {"elo": ELO_BASE, "appearances": 0, "wins": 0, "draws": 0, "losses": 0, "goals": 0, "assists": 0})
+
+    log = []
+    for a_ids, b_ids, scoreA, scoreB, extra in sides:
+        if not a_ids or not b_ids:
+            continue
+        eloA = sum(rows[p]["elo"] for p in a_ids) / len(a_ids)
+        eloB = sum(rows[p]["elo"] for p in b_ids) / len(b_ids)
+        expectedA = 1.0 / (1.0 + 10 ** ((eloB - eloA) / 400.0))
+        actualA = 1.0 if scoreA > scoreB else (0.5 if scoreA == scoreB else 0.0)
+        delta = ELO_K * (actualA - expectedA)
+        for ids, sign, outcome in ((a_ids, 1.0, actualA), (b_ids, -1.0, 1.0 - actualA)):
+            for pid in ids:
+                s = rows[pid]
+                s["elo"] += sign * delta
+                s["appearances"] += 1
+                s["wins" if outcome == 1.0 else ("draws" if outcome == 0.5 else "losses")] += 1
+        for pid, line in extra.items():
+            if pid in rows:
+                rows[pid]["goals"] += int(line.get("goals", 0))
+                rows[pid]["assists"] += int(line.get("assists", 0))
+        log.append((source, json.dumps(a_ids), json.dumps(b_ids), scoreA, scoreB))
+
+    stats_store.save(rows, log)
+    cache_player_stats(rows)
+    # Matches with a side that has no player ids are skipped
+    return rows, len(log)
+
 
 @app.get("/")
 def home() -> Dict[str, str]:
@@ -58,9 +280,50 @@ def player_rating(player: Dict[str, Any]) -> float:
             return float(player["rating"]) * 1.0
         except Exception:
             pass
+    # Stored Elo shifts the level score of players with an id; callers warm
+    # the cache in bulk first
+    pid = stats_id(player)
+    stats = cached_player_stats(pid) if pid else None
+    if stats:
+        return float(r) + (stats["elo"] - ELO_BASE) / ELO_PER_LEVEL
     return float(r)
 
 
+def player_position(player: Dict[str, Any]) -> str:
+    # Unknown or missing positions are treated as midfielders
+    pos = player.get("position")
+    return pos if pos in pos_index else "Midfielder"
+
+
+class PlayerPool:
+    # Struct-of-arrays view of a request's players, built once so the hot loops
+    # work on integer codes instead of string-keyed dict lookups. The JSON
+    # dicts are only touched again when the response is assembled.
+    __slots__ = ("players", "pos", "rating", "captain")
+
+    def __init__(self, players: List[Dict[str, Any]]) -> None:
+        warm_stats_cache(players)
+        self.players = players
+        self.pos = [pos_index[player_position(p)] for p in players]
+        self.rating = [player_rating(p) for p in players]
+        self.captain = [bool(p.get("captain")) for p in players]
+
+    def __len__(self) -> int:
+        return len(self.players)
+
+    def rebuild(self, teams: List[List[int]]) -> List[List[Dict[str, Any]]]:
+        return [[self.players[i] for i in t] for t in teams]
+
+    def subset(self, indices: List[int]) -> "PlayerPool":
+        # The given rows, in order, without parsing the players again
+        pool = PlayerPool.__new__(PlayerPool)
+        pool.players = [self.players[i] for i in indices]
+        pool.pos = [self.pos[i] for i in indices]
+        pool.rating = [self.rating[i] for i in indices]
+        pool.captain = [self.captain[i] for i in indices]
+        return pool
+
+
 def fitness_formation(teams: List[List[Dict[str, Any]]]) -> float:
     score_penalty = 0.0
     pos_penalty = 0.0
@@ -75,17 +338,17 @@ def fitness_formation(teams: List[List[Dict[str, Any]]]) -> float:
     total_pos_counts = {pos: 0 for pos in positions}
     for team in teams:
         for p in team:
-            total_pos_counts[p["position"]] += 1
+            total_pos_counts[player_position(p)] += 1
 
     expected_pos = {pos: (total_pos_counts[pos] / len(teams) if teams else 0) for pos in positions}
 
     for team in teams:
-        score = sum(score_map.get(p["level"], 1) for p in team)
+        score = sum(player_rating(p) for p in team)
         scores.append(score)
 
         counts = {pos: 0 for pos in positions}
         for p in team:
-            counts[p["position"]] += 1
+            counts[player_position(p)] += 1
 
         if counts["Goalkeeper"] != 1:
             pos_penalty += abs(counts["Goalkeeper"] - 1) * 5
@@ -101,27 +364,602 @@ def fitness_formation(teams: List[List[Dict[str, Any]]]) -> float:
     return score_penalty + pos_penalty + size_penalty
 
 
-def genetic_multi_split(players: List[Dict[str, Any]], team_count: int, generations: int = 300) -> Optional[List[List[Dict[str, Any]]]]:
-    if not players:
-        return [[] for _ in range(team_count)]
+def fitness_formation_batch(assignments: Any, levels: Any, pos: Any, team_count: int) -> np.ndarray:
+    # Vectorised fitness_formation for a population: assignments is a
+    # (candidates x players) matrix of team indices, levels/pos are per-player
+    # ratings and position codes (PlayerPool.rating / PlayerPool.pos). Returns one penalty per candidate.
+    assign = np.asarray(assignments, dtype=np.int64)
+    if assign.ndim == 1:
+        assign = assign[None, :]
+    m, n = assign.shape
+    levels = np.asarray(levels, dtype=np.float64)
+    pos = np.asarray(pos, dtype=np.int64)
+
+    # Offset each candidate's team ids so one bincount covers the whole population
+    flat = (assign + (np.arange(m, dtype=np.int64) * team_count)[:, None]).ravel()
+    cells = m * team_count
+    sums = np.bincount(flat, weights=np.broadcast_to(levels, (m, n)).ravel(), minlength=cells).reshape(m, team_count)
+    sizes = np.bincount(flat, minlength=cells).reshape(m, team_count)
+    counts = np.bincount(flat * 4 + np.broadcast_to(pos, (m, n)).ravel(), minlength=cells * 4).reshape(m, team_count, 4)
+
+    expected = np.bincount(pos, minlength=4) / team_count
+    score_penalty = np.abs(sums - levels.sum() / team_count).sum(axis=1)
+    pos_penalty = np.abs(counts - expected).sum(axis=(1, 2)) + 5 * np.abs(counts[:, :, 0] - 1).sum(axis=1)
+    size_penalty = np.abs(sizes - n / team_count).sum(axis=1)
+    return score_penalty + pos_penalty + size_penalty
 
-    best_teams: Optional[List[List[Dict[str, Any]]]] = None
-    best_score = float("inf")
 
-    for _ in range(generations):
-        random.shuffle(players)
-        teams: List[List[Dict[str, Any]]] = [[] for _ in range(team_count)]
+class SplitState:
+    # Incremental view of a team split for local search. fitness_formation is a
+    # sum of independent per-team terms (the averages it compares against only
+    # depend on the whole pool), so moving one player only touches two terms.
+    __slots__ = ("team_of", "levels", "pos", "team_count", "sums", "counts", "sizes",
+                 "avg_score", "avg_size", "expected", "terms", "total")
+
+    def __init__(self, levels: List[float], pos: List[int], team_of: List[int], team_count: int) -> None:
+        self.levels = levels
+        self.pos = pos
+        self.team_of = team_of
+        self.team_count = team_count
+        # bincount adds in player order, so the sums match a Python loop exactly
+        teams = np.asarray(team_of, dtype=np.int64)
+        self.sums = np.bincount(teams, weights=np.asarray(levels, dtype=np.float64), minlength=team_count).tolist()
+        self.counts = np.bincount(teams * 4 + np.asarray(pos, dtype=np.int64), minlength=team_count * 4).tolist()
+        self.sizes = np.bincount(teams, minlength=team_count).tolist()
+        n = len(levels)
+        self.avg_score = sum(self.sums) / team_count
+        self.avg_size = n / team_count
+        totals = [0] * 4
+        for k in pos:
+            totals[k] += 1
+        self.expected = [c / team_count for c in totals]
+        self.terms = [self.term_after(t, 0.0, 0, -1, -1) for t in range(team_count)]
+        self.total = sum(self.terms)
+
+    def term_after(self, t: int, dscore: float, dsize: int, pos_out: int, pos_in: int) -> float:
+        # Unrolled over the four positions: this is the innermost call of
+        # every search, and summing in the same order keeps results identical
+        c = self.counts[t * 4:t * 4 + 4]
+        if pos_out >= 0:
+            c[pos_out] -= 1
+        if pos_in >= 0:
+            c[pos_in] += 1
+        e = self.expected
+        pen = abs(self.sums[t] + dscore - self.avg_score) + abs(self.sizes[t] + dsize - self.avg_size)
+        pen += abs(c[0] - e[0])
+        if c[0] != 1:
+            pen += abs(c[0] - 1) * 5
+        pen += abs(c[1] - e[1])
+        pen += abs(c[2] - e[2])
+        pen += abs(c[3] - e[3])
+        return pen
+
+    def delta_swap(self, i: int, j: int) -> float:
+        a = self.team_of[i]
+        b = self.team_of[j]
+        if a == b:
+            return 0.0
+        dl = self.levels[j] - self.levels[i]
+        pi = self.pos[i]
+        pj = self.pos[j]
+        if pi == pj:
+            pi = pj = -1
+        return (self.term_after(a, dl, 0, pi, pj) - self.terms[a]
+                + self.term_after(b, -dl, 0, pj, pi) - self.terms[b])
+
+    def delta_move(self, i: int, b: int) -> float:
+        a = self.team_of[i]
+        if a == b:
+            return 0.0
+        li = self.levels[i]
+        pi = self.pos[i]
+        return (self.term_after(a, -li, -1, pi, -1) - self.terms[a]
+                + self.term_after(b, li, 1, -1, pi) - self.terms[b])
+
+    def apply_move(self, i: int, b: int) -> None:
+        a = self.team_of[i]
+        if a == b:
+            return
+        li = self.levels[i]
+        pi = self.pos[i]
+        new_a = self.term_after(a, -li, -1, pi, -1)
+        new_b = self.term_after(b, li, 1, -1, pi)
+        self.total += new_a - self.terms[a] + new_b - self.terms[b]
+        self.terms[a] = new_a
+        self.terms[b] = new_b
+        self.sums[a] -= li
+        self.sums[b] += li
+        self.sizes[a] -= 1
+        self.sizes[b] += 1
+        self.counts[a * 4 + pi] -= 1
+        self.counts[b * 4 + pi] += 1
+        self.team_of[i] = b
+
+    def apply_swap(self, i: int, j: int) -> None:
+        b = self.team_of[j]
+        self.apply_move(j, self.team_of[i])
+        self.apply_move(i, b)
+
+    def members(self) -> List[List[int]]:
+        out: List[List[int]] = [[] for _ in range(self.team_count)]
+        for i, t in enumerate(self.team_of):
+            out[t].append(i)
+        return out
+
+
+def initial_assignment(levels: List[float], pos: List[int], team_count: int, rng: Any = random) -> List[int]:
+    # Snake-deal each position group strongest-first; shuffling first breaks ties randomly
+    order = list(range(len(levels)))
+    rng.shuffle(order)
+    order.sort(key=lambda i: (pos[i], -levels[i]))
+    team_of = [0] * len(levels)
+    for k, i in enumerate(order):
+        r, c = divmod(k, team_count)
+        team_of[i] = c if r % 2 == 0 else team_count - 1 - c
+    return team_of
+
+
+def local_search(state: SplitState, steps: int, rng: Any = random, stall_limit: Optional[int] = None, deadline: Optional[float] = None, trace: Optional[List[Tuple[int, float]]] = None) -> int:
+    # Hill climbing over random swaps and single-player moves. Sideways moves are
+    # accepted so the search can drift across plateaus; the current state is
+    # always the best seen, so stopping at `deadline` (a perf_counter value)
+    # still leaves a valid answer. `trace` collects (step, best) at
+    # log-spaced steps.
+    n = len(state.team_of)
+    team_count = state.team_count
+    if n < 2 or team_count < 2:
+        return 0
+    if stall_limit is None:
+        stall_limit = max(2000, 20 * n)
+    best = state.total
+    since_improved = 0
+    step = 0
+    next_mark = 256
+    while step < steps and since_improved < stall_limit and best > 1e-9:
+        step += 1
+        if deadline is not None and step & 255 == 0 and time.perf_counter() >= deadline:
+            break
+        i = rng.randrange(n)
+        if rng.random() < 0.8:
+            j = rng.randrange(n)
+            d = state.delta_swap(i, j)
+            if d <= 1e-12 and state.team_of[i] != state.team_of[j]:
+                state.apply_swap(i, j)
+        else:
+            j = rng.randrange(team_count)
+            d = state.delta_move(i, j)
+            if d <= 1e-12 and state.team_of[i] != j:
+                state.apply_move(i, j)
+        if state.total < best - 1e-9:
+            best = state.total
+            since_improved = 0
+        else:
+            since_improved += 1
+        if trace is not None and step >= next_mark:
+            trace.append((step, best))
+            next_mark <<= 1
+    if trace is not None:
+        trace.append((step, best))
+    return step
+
+
+def starting_assignment(levels: List[float], pos: List[int], team_count: int, population_size: int = 16, rng: Any = random) -> Tuple[List[int], float]:
+    # Seed the search from the best of a small population of starting deals,
+    # scored in one vectorised pass
+    n = len(levels)
+    population = [initial_assignment(levels, pos, team_count, rng)]
+    for _ in range(population_size - 1):
+        order = list(range(n))
+        rng.shuffle(order)
+        deal = [0] * n
+        for k, i in enumerate(order):
+            deal[i] = k % team_count
+        population.append(deal)
+    scores = fitness_formation_batch(population, levels, pos, team_count)
+    best = int(np.argmin(scores))
+    return population[best], float(scores[best])
+
+
+def optimise_split(pool: PlayerPool, team_count: int, generations: int = 300, population_size: int = 16, rng: Any = random, time_budget: Optional[float] = None, stats: Optional[Dict[str, Any]] = None) -> Optional[List[List[int]]]:
+    if team_count < 1:
+        return None
+    if not len(pool):
+        return [[] for _ in range(team_count)]
 
+    start = time.perf_counter()
+    levels = pool.rating
+    pos = pool.pos
+    n = len(pool)
+
+    team_of, population_best = starting_assignment(levels, pos, team_count, population_size, rng)
+    state = SplitState(levels, pos, team_of, team_count)
+    # A delta evaluation touches two players where a full fitness_formation pass
+    # touches all of them, so `generations` full passes buy generations * n steps.
+    # With a time budget the search is bounded by the clock instead.
+    trace = [(0, state.total)] if stats is not None else None
+    if time_budget is None:
+        steps = local_search(state, generations * n, rng, trace=trace)
+    else:
+        steps = local_search(state, sys.maxsize, rng, deadline=start + time_budget, trace=trace)
+    if stats is not None:
+        stats.update(steps=steps, population_best=population_best, final_fitness=state.total,
+                     trajectory=trace, seconds=time.perf_counter() - start)
+    return state.members()
+
+
+def genetic_multi_split(players: List[Dict[str, Any]], team_count: int, generations: int = 300, population_size: int = 16, rng: Any = random) -> Optional[List[List[Dict[str, Any]]]]:
+    pool = PlayerPool(players)
+    members = optimise_split(pool, team_count, generations, population_size, rng)
+    return pool.rebuild(members) if members is not None else None
+
+
+# Island search: independent searches that swap their best splits every
+# epoch. Islands beyond the worker count queue for a free process; 0 gives
+# each search one process per core. Island requests run on their own pool of
+# ISLAND_SEARCHES workers, so only that many searches hold the cores at once.
+ISLAND_WORKERS = int(os.environ.get("FOOTBOT_ISLAND_WORKERS", 0))
+ISLAND_SEARCHES = int(os.environ.get("FOOTBOT_ISLAND_SEARCHES", 1))
+MAX_ISLANDS = 32
+ISLAND_EPOCHS = 8
+
+
+def run_island(levels: List[float], pos: List[int], team_count: int, team_of: List[int], steps: int, rng_state: Any, time_budget: Optional[float] = None) -> Tuple[float, List[int], Any, int]:
+    # Process-pool entry point: one epoch of local search on one island. The
+    # RNG state travels with the island so epochs chain deterministically.
+    rng = random.Random()
+    rng.setstate(rng_state)
+    state = SplitState(levels, pos, team_of, team_count)
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    done = local_search(state, steps, rng, deadline=deadline)
+    return state.total, state.team_of, rng.getstate(), done
+
+
+def island_workers(islands: int) -> int:
+    workers = ISLAND_WORKERS or os.cpu_count() or 1
+    return max(1, min(islands, workers))
+
+
+def optimise_split_islands(pool: PlayerPool, team_count: int, islands: int, generations: int = 300, population_size: int = 16, rng: Any = random, time_budget: Optional[float] = None, stats: Optional[Dict[str, Any]] = None, epochs: int = ISLAND_EPOCHS) -> Optional[List[List[int]]]:
+    # The islands share the single-search step budget, so a step-budget run
+    # costs no more CPU than one search and finishes sooner on more cores.
+    # With a time budget every island searches for the whole budget. After
+    # each epoch island k adopts island k-1's split if that one is strictly
+    # better (a ring), and the best island wins with ties going to the lowest
+    # index. Each island has its own RNG drawn from `rng` and results are
+    # gathered in island order, so a seeded step-budget run is reproducible
+    # for a given island count whatever the worker count or scheduling.
+    n = len(pool)
+    if islands <= 1 or n < 2 or team_count < 2:
+        return optimise_split(pool, team_count, generations, population_size, rng, time_budget, stats)
+
+    start = time.perf_counter()
+    levels = pool.rating
+    pos = pool.pos
+    rngs = [random.Random(rng.getrandbits(64)) for _ in range(islands)]
+    starts = [starting_assignment(levels, pos, team_count, population_size, r) for r in rngs]
+    assignments = [team_of for team_of, _ in starts]
+    totals = [score for _, score in starts]
+    rng_states = [r.getstate() for r in rngs]
+    population_best = min(totals)
+
+    steps_per_epoch = max(1, generations * n // (epochs * islands)) if time_budget is None else sys.maxsize
+    steps = 0
+    trace = [(0, population_best)]
+    # The pool lives for one search only: a long-lived pool inherited by a
+    # forked generate worker can neither take work nor shut down cleanly.
+    # With a single worker the islands run in turn here, skipping the fork.
+    workers = island_workers(islands)
+    waves = -(-islands // workers)
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=POOL_CONTEXT) if workers > 1 else None
+    try:
+        for epoch in range(epochs):
+            epoch_budget = None
+            if time_budget is not None:
+                remaining = start + time_budget - time.perf_counter()
+                if remaining <= 0:
+                    break
+                # Islands beyond the worker count run in later waves
+                epoch_budget = remaining / (epochs - epoch) / waves
+            jobs = [(levels, pos, team_count, assignments[k], steps_per_epoch, rng_states[k], epoch_budget) for k in range(islands)]
+            if executor is None:
+                results = [run_island(*job) for job in jobs]
+            else:
+                futures = [executor.submit(run_island, *job) for job in jobs]
+                results = [f.result() for f in futures]
+            totals = [r[0] for r in results]
+            assignments = [r[1] for r in results]
+            rng_states = [r[2] for r in results]
+            steps += sum(r[3] for r in results)
+            trace.append((steps, min(totals)))
+            if min(totals) <= 1e-9:
+                break
+            # Ring migration, decided on this epoch's results only
+            migrants = [(totals[k - 1], assignments[k - 1]) for k in range(islands)]
+            for k, (total, team_of) in enumerate(migrants):
+                if total < totals[k] - 1e-9:
+                    totals[k] = total
+                    assignments[k] = list(team_of)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    best = min(range(islands), key=lambda k: (totals[k], k))
+    state = SplitState(levels, pos, assignments[best], team_count)
+    if stats is not None:
+        stats.update(steps=steps, population_best=population_best, final_fitness=state.total,
+                     trajectory=trace, seconds=time.perf_counter() - start, islands=islands)
+    return state.members()
+
+
+# Rebalancing: teams inspected per step, and the smallest gain worth moving a
+# player for once the late arrivals are placed
+REBALANCE_SOURCES = 2
+REBALANCE_EXTREMES = 1
+REBALANCE_MIN_GAIN = 0.5
+MAX_REBALANCE_MOVES = 50
+
+
+class CandidateIndex:
+    # Sources are the worst-scoring teams; targets add the teams at either end
+    # of every quantity a move can fix (strength, size, each position count).
+    # Teams are kept sorted by each of those, so after a move only the two
+    # teams it touched are re-filed instead of every team being re-ranked.
+    __slots__ = ("state", "small", "values", "orders")
+
+    def __init__(self, state: SplitState) -> None:
+        self.state = state
+        self.small = state.team_count <= 2 * (REBALANCE_SOURCES + REBALANCE_EXTREMES)
+        self.values = [[self.value(k, t) for t in range(state.team_count)] for k in range(7)]
+        self.orders = [sorted((v, t) for t, v in enumerate(vals)) for vals in self.values]
+
+    def value(self, k: int, t: int) -> float:
+        state = self.state
+        if k == 0:
+            return state.terms[t]
+        if k == 1:
+            return state.sums[t]
+        if k == 2:
+            return state.sizes[t]
+        return state.counts[t * 4 + k - 3]
+
+    def update(self, t: int) -> None:
+        for k, order in enumerate(self.orders):
+            del order[bisect.bisect_left(order, (self.values[k][t], t))]
+            v = self.values[k][t] = self.value(k, t)
+            bisect.insort(order, (v, t))
+
+    def candidates(self) -> Tuple[List[int], List[int]]:
+        if self.small:
+            every = list(range(self.state.team_count))
+            return every, every
+        sources = [t for _, t in reversed(self.orders[0][-REBALANCE_SOURCES:])]
+        targets = set(sources)
+        for order in self.orders[1:]:
+            targets.update(t for _, t in order[:REBALANCE_EXTREMES])
+            targets.update(t for _, t in order[-REBALANCE_EXTREMES:])
+        return sources, sorted(targets)
+
+
+def rebalance_split(state: SplitState, movable: List[bool], max_moves: int, min_gain: float = REBALANCE_MIN_GAIN, stop_at: float = 0.0, index: Optional[CandidateIndex] = None) -> int:
+    # Greedy best-improvement over single moves and swaps of movable players.
+    # Stops when nothing gains at least `min_gain`, when `max_moves` players
+    # have been relocated, or once the fitness is back down to `stop_at`.
+    # Within a (team, position) slot only the players whose rating is nearest
+    # the ideal transfer can be best (the strength term is convex and
+    # symmetric around half the gap), so slots are kept rating-sorted and
+    # searched by bisection. The best move and swap between two teams only
+    # depend on those two teams, so they are cached per pair and recomputed
+    # once either team's version changes. Returns the number of relocations.
+    if max_moves <= 0 or state.total <= stop_at + 1e-9:
+        return 0
+    index = index or CandidateIndex(state)
+    version = [0] * state.team_count
+    move_cache: Dict[Tuple[int, int], Tuple[int, int, float, Optional[Tuple[int, int, int]]]] = {}
+    swap_cache: Dict[Tuple[int, int], Tuple[int, int, float, Optional[Tuple[int, int, int]]]] = {}
+    levels = state.levels
+    pos = state.pos
+    slot_keys: List[List[float]] = [[] for _ in range(state.team_count * 4)]
+    slot_ids: List[List[int]] = [[] for _ in range(state.team_count * 4)]
+    for i in sorted((i for i in range(len(levels)) if movable[i]), key=levels.__getitem__):
+        slot = state.team_of[i] * 4 + pos[i]
+        slot_keys[slot].append(levels[i])
+        slot_ids[slot].append(i)
+
+    def relocate(i: int, b: int) -> None:
+        a = state.team_of[i]
+        slot = a * 4 + pos[i]
+        k = bisect.bisect_left(slot_keys[slot], levels[i])
+        while slot_ids[slot][k] != i:
+            k += 1
+        del slot_keys[slot][k], slot_ids[slot][k]
+        state.apply_move(i, b)
+        slot = b * 4 + pos[i]
+        k = bisect.bisect_right(slot_keys[slot], levels[i])
+        slot_keys[slot].insert(k, levels[i])
+        slot_ids[slot].insert(k, i)
+        for t in (a, b):
+            version[t] += 1
+            index.update(t)
+
+    def nearest(keys: List[float], want: float) -> List[int]:
+        k = bisect.bisect_left(keys, want)
+        return [c for c in (k - 1, k) if 0 <= c < len(keys)]
+
+    def pair_move(a: int, b: int) -> Tuple[float, Optional[Tuple[int, int, int]]]:
+        best_d = math.inf
+        best = None
+        half = (state.sums[a] - state.sums[b]) / 2.0
+        for src_team, dst, want in ((a, b, half), (b, a, -half)):
+            for p in range(4):
+                slot = src_team * 4 + p
+                for c in nearest(slot_keys[slot], want):
+                    i = slot_ids[slot][c]
+                    d = state.delta_move(i, dst)
+                    if d < best_d:
+                        best_d, best = d, (i, -1, dst)
+        return best_d, best
+
+    def pair_swap(a: int, b: int) -> Tuple[float, Optional[Tuple[int, int, int]]]:
+        best_d = math.inf
+        best = None
+        half = (state.sums[a] - state.sums[b]) / 2.0
+        for p in range(4):
+            keys_a = slot_keys[a * 4 + p]
+            for q in range(4):
+                keys_b = slot_keys[b * 4 + q]
+                if not keys_a or not keys_b:
+                    continue
+                # Pair whose rating gap is closest to half the strength
+                # gap, by one merge-style pass over both sorted slots
+                x = y = bx = by = 0
+                gap = math.inf
+                nb = len(keys_b)
+                while x < len(keys_a) and y < nb:
+                    g = keys_a[x] - keys_b[y] - half
+                    if abs(g) < gap:
+                        gap, bx, by = abs(g), x, y
+                    if g > 0:
+                        y += 1
+                    else:
+                        x += 1
+                i = slot_ids[a * 4 + p][bx]
+                j = slot_ids[b * 4 + q][by]
+                d = state.delta_swap(i, j)
+                if d < best_d:
+                    best_d, best = d, (i, j, -1)
+        return best_d, best
+
+    def best_over(sources: List[int], targets: List[int], cache: Dict[Tuple[int, int], Any], search: Callable[[int, int], Tuple[float, Optional[Tuple[int, int, int]]]]) -> Optional[Tuple[int, int, int]]:
+        best_d = -min_gain
+        best = None
+        for a in sources:
+            for b in targets:
+                if a == b:
+                    continue
+                hit = cache.get((a, b))
+                if hit is None or hit[0] != version[a] or hit[1] != version[b]:
+                    hit = cache[(a, b)] = (version[a], version[b]) + search(a, b)
+                if hit[2] < best_d:
+                    best_d, best = hit[2], hit[3]
+        return best
+
+    moved = 0
+    while moved < max_moves and state.total > stop_at + 1e-9:
+        sources, targets = index.candidates()
+        best = best_over(sources, targets, move_cache, pair_move)
+        # A swap relocates two players, so it is only tried when no single move helps
+        if best is None and moved + 2 <= max_moves:
+            best = best_over(sources, targets, swap_cache, pair_swap)
+        if best is None:
+            break
+        i, j, dst = best
+        if j < 0:
+            relocate(i, dst)
+            moved += 1
+        else:
+            a = state.team_of[i]
+            relocate(i, state.team_of[j])
+            relocate(j, a)
+            moved += 2
+    return moved
+
+
+def rebalance_teams(teams: List[Dict[str, Any]], added: List[Dict[str, Any]], removed: List[Any], max_moves: int = MAX_REBALANCE_MOVES, min_gain: float = REBALANCE_MIN_GAIN) -> Dict[str, Any]:
+    team_count = len(teams)
+    players: List[Dict[str, Any]] = []
+    team_of: List[int] = []
+    for t, team in enumerate(teams):
+        for p in team.get("players") or []:
+            players.append(p)
+            team_of.append(t)
+
+    # Dropouts are matched by id or by name. A player object matches on its
+    # id when it has one, else on its name; a plain string tries both. The
+    # first player not already removed wins.
+    gone = set()
+    unknown = []
+    by_id: Dict[str, List[int]] = {}
+    by_name: Dict[str, List[int]] = {}
+    if removed:
         for i, p in enumerate(players):
-            teams[i % team_count].append(p)
-
-        f = fitness_formation(teams)
-
-        if f < best_score:
-            best_score = f
-            best_teams = [t[:] for t in teams]
-
-    return best_teams
+            pid = str(p.get("id") or "").strip()
+            if pid:
+                by_id.setdefault(pid, []).append(i)
+            name = str(p.get("name") or "").strip()
+            if name:
+                by_name.setdefault(name, []).append(i)
+    for ref in removed:
+        if isinstance(ref, dict):
+            pid = str(ref.get("id") or "").strip()
+            matches = by_id.get(pid, []) if pid else by_name.get(str(ref.get("name") or "").strip(), [])
+        else:
+            key = str(ref).strip()
+            matches = by_id.get(key, []) + by_name.get(key, [])
+        i = next((i for i in matches if i not in gone), None)
+        if i is None:
+            unknown.append(ref)
+        else:
+            gone.add(i)
+
+    # Everyone is parsed once; the fitness of the lineup before anyone arrived
+    # or left is the level to get back to
+    full = PlayerPool(players + list(added))
+    before = SplitState(full.rating[:len(players)], full.pos[:len(players)], list(team_of), team_count).total
+
+    kept = [i for i in range(len(players)) if i not in gone] + list(range(len(players), len(full)))
+    pool = full.subset(kept)
+    n_kept = len(kept) - len(added)
+    original = [team_of[i] for i in kept[:n_kept]] + [-1] * len(added)
+
+    # Late arrivals go strongest-first to the smallest, then weakest, team
+    current = [0] * team_count
+    sums = [0.0] * team_count
+    for k, t in enumerate(original[:n_kept]):
+        current[t] += 1
+        sums[t] += pool.rating[k]
+    heap = [(current[t], sums[t], t) for t in range(team_count)]
+    heapq.heapify(heap)
+    assign = original[:n_kept]
+    for k in sorted(range(n_kept, len(pool)), key=lambda k: -pool.rating[k]):
+        size, total, t = heapq.heappop(heap)
+        assign.append(t)
+        heapq.heappush(heap, (size + 1, total + pool.rating[k], t))
+
+    state = SplitState(pool.rating, pool.pos, assign, team_count)
+    index = CandidateIndex(state)
+    # Arrivals then settle into whichever candidate team suits them best (this
+    # is free); only after that are existing players moved, never the captains
+    for k in range(n_kept, len(pool)):
+        _, targets = index.candidates()
+        d, b = min((state.delta_move(k, b), b) for b in targets)
+        if d < -1e-9:
+            a = state.team_of[k]
+            state.apply_move(k, b)
+            index.update(a)
+            index.update(b)
+    movable = [k < n_kept and not pool.captain[k] for k in range(len(pool))]
+    rebalance_split(state, movable, max_moves, min_gain=min_gain, stop_at=before, index=index)
+
+    members = state.members()
+    teams_out = []
+    for t, team in enumerate(teams):
+        team_players = [pool.players[k] for k in members[t]]
+        if members[t] and not any(pool.captain[k] for k in members[t]):
+            captain = max(range(len(members[t])), key=lambda x: pool.rating[members[t][x]])
+            team_players[captain] = dict(team_players[captain], captain=True)
+        teams_out.append(dict(team, players=team_players))
+
+    moves = [{"player": player_key(pool.players[k]), "from": original[k], "to": state.team_of[k]}
+             for k in range(n_kept) if state.team_of[k] != original[k]]
+    placed = [{"player": player_key(pool.players[k]), "team": state.team_of[k]} for k in range(n_kept, len(pool))]
+    return {
+        "teams": teams_out,
+        "moves": moves,
+        "added": placed,
+        "removed": [player_key(players[i]) for i in sorted(gone)],
+        "unknown": unknown,
+        "fitness": {"before": before, "after": state.total},
+    }
 
 
 # Helper math/stat functions
@@ -134,7 +972,7 @@ def logistic_prob(a: float, b: float, k: float = 1.0) -> float:
         return 0.0 if a < b else 1.0
 
 
-def poisson_sample(lmbda: float) -> int:
+def poisson_sample(lmbda: float, rng: Any = random) -> int:
     if lmbda <= 0:
         return 0
     L = math.exp(-lmbda)
@@ -142,7 +980,7 @@ def poisson_sample(lmbda: float) -> int:
     p = 1.0
     while p > L:
         k += 1
-        p *= random.random()
+        p *= rng.random()
         if k > 100:
             break
     return k - 1 if k > 0 else 0
@@ -164,20 +1002,35 @@ def expected_goals(strA: float, strB: float, base: float = 1.0) -> float:
 
 def compute_team_strength(team: Dict[str, Any]) -> float:
     starters = team.get("starters", []) or team.get("players", [])
+    warm_stats_cache(starters)
     # Subs removed: only consider starters for strength
     s = sum(player_rating(p) for p in starters)
     return s
 
 
-def simulate_match(teamA: Dict[str, Any], teamB: Dict[str, Any], base: float = 1.0) -> Dict[str, Any]:
+def team_strengths(teams: List[Dict[str, Any]]) -> List[float]:
+    # One bulk stats query for every team, then the per-team sums
+    warm_stats_cache([p for t in teams for p in (t.get("starters") or t.get("players") or [])])
+    return [compute_team_strength(t) for t in teams]
+
+
+def goal_rates(strA: float, strB: float, base: float = 1.0) -> Tuple[float, float]:
+    # Each side's Poisson scoring rate, taken from its own point of view
+    expA, _ = expected_goals(strA, strB, base=base)
+    expB, _ = expected_goals(strB, strA, base=base)
+    return expA, expB
+
+
+def simulate_match(teamA: Dict[str, Any], teamB: Dict[str, Any], base: float = 1.0, rng: Any = random) -> Dict[str, Any]:
     strA = compute_team_strength(teamA)
     strB = compute_team_strength(teamB)
+    expA, expB = goal_rates(strA, strB, base=base)
+    return match_result(strA, strB, expA, expB, poisson_sample(expA, rng), poisson_sample(expB, rng))
+
+
+def match_result(strA: float, strB: float, expA: float, expB: float, goalsA: int, goalsB: int) -> Dict[str, Any]:
     probA = logistic_prob(strA, strB, k=3.0)
     probB = 1.0 - probA
-    expA, _ = expected_goals(strA, strB, base=base)
-    expB, _ = expected_goals(strB, strA, base=base)
-    goalsA = poisson_sample(expA)
-    goalsB = poisson_sample(expB)
     if probA > probB:
         pred = "A"
     elif probB > probA:
@@ -193,95 +1046,295 @@ def simulate_match(teamA: Dict[str, Any], teamB: Dict[str, Any], base: float = 1
     return result
 
 
-def enforce_formation_and_build_teams(players: List[Dict[str, Any]], team_count: int, formation: Dict[str, int], team_size: int, subs: int = 0) -> List[Dict[str, Any]]:
-    # Create buckets by position
-    pool = players[:]
-    random.shuffle(pool)
-    by_pos = {pos: [p for p in pool if p.get("position") == pos] for pos in positions}
+def simulate_match_monte_carlo(teamA: Dict[str, Any], teamB: Dict[str, Any], iterations: int, base: float = 1.0, rng: Optional[np.random.Generator] = None) -> Dict[str, Any]:
+    return monte_carlo_strengths(compute_team_strength(teamA), compute_team_strength(teamB), iterations, base, rng)
 
-    teams: List[Dict[str, Any]] = []
-    for _ in range(team_count):
-        teams.append({"starters": []})
 
-    # Assign goalkeepers first
-    for t in range(team_count):
-        if by_pos["Goalkeeper"]:
-            teams[t]["starters"].append(by_pos["Goalkeeper"].pop())
-        else:
-            # fallback: pick any player
-            for pos in ["Defender", "Midfielder", "Forward"]:
-                if by_pos[pos]:
-                    teams[t]["starters"].append(by_pos[pos].pop())
-                    break
+def monte_carlo_strengths(strA: float, strB: float, iterations: int, base: float = 1.0, rng: Optional[np.random.Generator] = None) -> Dict[str, Any]:
+    # Batched Poisson draws for `iterations` replays of the same fixture
+    if rng is None:
+        rng = np.random.default_rng()
+    expA, expB = goal_rates(strA, strB, base=base)
+    goalsA = rng.poisson(expA, iterations)
+    goalsB = rng.poisson(expB, iterations)
+    diff = goalsA - goalsB
 
-    # Assign outfield according to formation
-    for pos in ["Defender", "Midfielder", "Forward"]:
-        needed = formation.get(pos, 0)
-        for t in range(team_count):
-            for _ in range(needed):
-                if by_pos[pos]:
-                    teams[t]["starters"].append(by_pos[pos].pop())
-                else:
-                    # try to fill from other positions
-                    picked = None
-                    for ppos in positions:
-                        if ppos == "Goalkeeper":
-                            continue
-                        if by_pos.get(ppos):
-                            picked = by_pos[ppos].pop()
-                            teams[t]["starters"].append(picked)
-                            break
-                    if not picked:
-                        # no players left; break early
-                        break
-
-    # Collect remaining players (including any remaining goalkeepers)
-    remaining = [p for lst in by_pos.values() for p in lst]
-    # Sort remaining by level (Advanced first)
-    level_order = {"Advanced": 3, "Intermediate": 2, "Beginner": 1}
-    remaining.sort(key=lambda x: level_order.get(x.get("level"), 1), reverse=True)
-
-    # Fill starters until all players are assigned. If teams exceed team_size, allow extras (no subs concept).
-    for p in remaining:
-        # prefer teams with fewer starters
-        teams_sorted = sorted(teams, key=lambda t: len(t["starters"]))
-        teams_sorted[0]["starters"].append(p)
-
-    # Ensure each team has at least 1 goalkeeper; if not, try to move one
-    for i, t in enumerate(teams):
-        if not any(pl.get("position") == "Goalkeeper" for pl in t["starters"]):
-            for j, other in enumerate(teams):
-                if i == j:
-                    continue
-                for pl in other["starters"]:
-                    if pl.get("position") == "Goalkeeper":
-                        other["starters"].remove(pl)
-                        t["starters"].append(pl)
-                        break
-                if any(pl.get("position") == "Goalkeeper" for pl in t["starters"]):
-                    break
+    wins = int(np.count_nonzero(diff > 0))
+    losses = int(np.count_nonzero(diff < 0))
+    draws = iterations - wins - losses
+
+    # Encode each scoreline as a single integer so one np.unique builds the histogram
+    width = int(goalsB.max()) + 1
+    codes, counts = np.unique(goalsA * width + goalsB, return_counts=True)
+    order = np.argsort(-counts, kind="stable")
+    scorelines = {f"{int(codes[i]) // width}-{int(codes[i]) % width}": int(counts[i]) for i in order}
+
+    diffs, diff_counts = np.unique(diff, return_counts=True)
+    goal_difference = {str(int(d)): int(c) for d, c in zip(diffs, diff_counts)}
+
+    return {
+        "iterations": iterations,
+        "outcome_probability": {"teamA": wins / iterations, "draw": draws / iterations, "teamB": losses / iterations},
+        "mean_score": {"teamA": float(goalsA.mean()), "teamB": float(goalsB.mean())},
+        "scorelines": scorelines,
+        "goal_difference": goal_difference,
+    }
+
+
+# Exact mode: scorelines past this many goals per side are folded into the
+# last row/column of the matrix, so the probabilities still sum to one
+EXACT_MAX_GOALS = 10
+MAX_EXACT_GOALS = 30
+# Strengths are rounded to this many decimals before the matrix lookup
+STRENGTH_DECIMALS = 2
+EXACT_CACHE_SIZE = 4096
+
+
+def poisson_pmf(lmbda: float, max_goals: int) -> np.ndarray:
+    k = np.arange(max_goals + 1)
+    if lmbda <= 0:
+        return (k == 0).astype(float)
+    log_fact = np.concatenate(([0.0], np.cumsum(np.log(k[1:]))))
+    pmf = np.exp(k * math.log(lmbda) - lmbda - log_fact)
+    pmf[-1] += max(0.0, 1.0 - pmf.sum())
+    return pmf
+
+
+@functools.lru_cache(maxsize=EXACT_CACHE_SIZE)
+def scoreline_matrix(strA: float, strB: float, base: float = 1.0, max_goals: int = EXACT_MAX_GOALS) -> np.ndarray:
+    # P(A scores i, B scores j) under the same Poisson rates as simulate_match
+    expA, expB = goal_rates(strA, strB, base=base)
+    matrix = np.outer(poisson_pmf(expA, max_goals), poisson_pmf(expB, max_goals))
+    matrix.setflags(write=False)
+    return matrix
+
+
+@functools.lru_cache(maxsize=EXACT_CACHE_SIZE)
+def scoreline_summary(strA: float, strB: float, base: float, max_goals: int, top: int) -> Dict[str, Any]:
+    matrix = scoreline_matrix(strA, strB, base, max_goals)
+    goals = np.arange(max_goals + 1)
+    win = float(np.tril(matrix, -1).sum())
+    draw = float(np.trace(matrix))
+    loss = float(np.triu(matrix, 1).sum())
+    order = np.argsort(-matrix, axis=None, kind="stable")[:top]
+    return {
+        "max_goals": max_goals,
+        "outcome_probability": {"teamA": win, "draw": draw, "teamB": loss},
+        "mean_score": {"teamA": float(matrix.sum(axis=1) @ goals), "teamB": float(matrix.sum(axis=0) @ goals)},
+        "scorelines": {f"{i // (max_goals + 1)}-{i % (max_goals + 1)}": float(matrix.flat[i]) for i in order.tolist()},
+        "goal_difference": {str(d): float(np.trace(matrix, offset=-d)) for d in range(-max_goals, max_goals + 1)},
+    }
+
+
+def exact_strengths(strA: float, strB: float, base: float = 1.0, max_goals: int = EXACT_MAX_GOALS, top: int = 10) -> Dict[str, Any]:
+    # Quantising the strengths lets repeated pairings share one cached matrix
+    summary = scoreline_summary(round(strA, STRENGTH_DECIMALS), round(strB, STRENGTH_DECIMALS), float(base), max_goals, top)
+    return dict(summary)
+
+
+def apply_exact(result: Dict[str, Any], exact: Dict[str, Any]) -> Dict[str, Any]:
+    # Report the winner from the same model the scoreline is drawn from
+    probs = exact["outcome_probability"]
+    result["exact"] = exact
+    result["win_probability"] = dict(probs)
+    best = max(probs, key=probs.get)
+    result["predicted_winner"] = {"teamA": "TeamA", "teamB": "TeamB"}.get(best, "Draw")
+    return result
+
+
+def assign_formation(pool: PlayerPool, team_count: int, formation: Dict[str, int], team_size: int, subs: int = 0, rng: Any = random, report: Optional[List[Dict[str, Any]]] = None) -> List[List[int]]:
+    # Heap-based builder: every slot goes to the currently weakest team that
+    # still needs it, and each bucket is dealt strongest-first, so strength
+    # stays balanced in O(n log n + n log T). Constraints that can't be met are
+    # appended to `report` instead of being dropped silently.
+    gk = pos_index["Goalkeeper"]
+    outfield = [pos_index[p] for p in ["Defender", "Midfielder", "Forward"]]
+    teams: List[List[int]] = [[] for _ in range(team_count)]
+    if team_count < 1:
+        return teams
+    strength = [0.0] * team_count
+
+    # Position buckets, strongest last so pop() is O(1); shuffle first for random tie-breaks
+    order = list(range(len(pool)))
+    rng.shuffle(order)
+    order.sort(key=lambda i: pool.rating[i])
+    by_pos: List[List[int]] = [[] for _ in positions]
+    for i in order:
+        by_pos[pool.pos[i]].append(i)
+
+    def give(t: int, i: int) -> None:
+        teams[t].append(i)
+        strength[t] += pool.rating[i]
+
+    def note(t: int, pos: int, issue: str, count: int = 1) -> None:
+        if report is not None:
+            report.append({"team": t, "position": positions[pos], "issue": issue, "count": count})
+
+    def fill(pos: int, needed: int) -> List[int]:
+        # Deal bucket `pos` strongest-first to the weakest team with a slot left
+        remaining = [needed] * team_count
+        heap = [(strength[t], t) for t in range(team_count)]
+        heapq.heapify(heap)
+        while heap and by_pos[pos]:
+            _, t = heapq.heappop(heap)
+            give(t, by_pos[pos].pop())
+            remaining[t] -= 1
+            if remaining[t]:
+                heapq.heappush(heap, (strength[t], t))
+        return remaining
+
+    # One goalkeeper per team; teams left without one get a stand-in from the
+    # outfield position with the most players to spare
+    wanted = {pos: max(0, int(formation.get(positions[pos], 0))) for pos in outfield}
+    for t, missing in enumerate(fill(gk, 1)):
+        if not missing:
+            continue
+        donor = max(outfield, key=lambda p: len(by_pos[p]) - wanted[p] * team_count)
+        if by_pos[donor]:
+            give(t, by_pos[donor].pop())
+            note(t, gk, "stand_in")
+        else:
+            note(t, gk, "unfilled")
+
+    # The formation's outfield slots
+    open_slots = [[0] * len(positions) for _ in range(team_count)]
+    for pos in outfield:
+        if wanted[pos]:
+            for t, missing in enumerate(fill(pos, wanted[pos])):
+                open_slots[t][pos] = missing
+
+    # Leftovers, strongest last; spare goalkeepers are only used once the
+    # outfield surplus runs out
+    spare_outfield = sorted((i for pos in outfield for i in by_pos[pos]), key=lambda i: pool.rating[i])
+    spare_keepers = by_pos[gk]
+
+    # Short positions are filled out of position from the surplus, weakest team first
+    heap = [(strength[t], t) for t in range(team_count) if any(open_slots[t][p] for p in outfield)]
+    heapq.heapify(heap)
+    while heap and (spare_outfield or spare_keepers):
+        _, t = heapq.heappop(heap)
+        pos = next(p for p in outfield if open_slots[t][p])
+        open_slots[t][pos] -= 1
+        give(t, (spare_outfield or spare_keepers).pop())
+        note(t, pos, "out_of_position")
+        if any(open_slots[t][p] for p in outfield):
+            heapq.heappush(heap, (strength[t], t))
+    for t in range(team_count):
+        for pos in outfield:
+            if open_slots[t][pos]:
+                note(t, pos, "unfilled", open_slots[t][pos])
+
+    # Everyone else joins the smallest team, weakest first on ties. If teams
+    # exceed team_size, allow extras (no subs concept).
+    heap = [(len(teams[t]), strength[t], t) for t in range(team_count)]
+    heapq.heapify(heap)
+    for i in spare_outfield[::-1] + spare_keepers[::-1]:
+        _, _, t = heapq.heappop(heap)
+        give(t, i)
+        heapq.heappush(heap, (len(teams[t]), strength[t], t))
 
     return teams
 
 
-def create_schedule_list(teams: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def team_ref_index(ref: Any, team_count: int) -> Optional[int]:
+    # Team references arrive as indices or "Team N" labels
+    idx = None
+    if isinstance(ref, int) and not isinstance(ref, bool):
+        idx = ref
+    elif isinstance(ref, str):
+        m = re.match(r"Team\s*(\d+)", ref)
+        if m:
+            idx = int(m.group(1)) - 1
+    return idx if idx is not None and 0 <= idx < team_count else None
+
+
+def simulate_fixtures(strengths: List[float], fixtures: List[Tuple[int, int]], iterations: int = 1, base: float = 1.0, rng: Optional[np.random.Generator] = None, mode: str = "sample", max_goals: int = EXACT_MAX_GOALS) -> List[Dict[str, Any]]:
+    # One Poisson draw covers every fixture's scoreline
+    if rng is None:
+        rng = np.random.default_rng()
+    if not fixtures:
+        return []
+    rates = np.array([goal_rates(strengths[a], strengths[b], base=base) for a, b in fixtures])
+    goals = rng.poisson(rates)
+    out = []
+    for (a, b), (expA, expB), (goalsA, goalsB) in zip(fixtures, rates.tolist(), goals.tolist()):
+        res = match_result(strengths[a], strengths[b], expA, expB, goalsA, goalsB)
+        if mode == "exact":
+            apply_exact(res, exact_strengths(strengths[a], strengths[b], base, max_goals))
+        if iterations > 1:
+            res["monte_carlo"] = monte_carlo_strengths(strengths[a], strengths[b], iterations, base, rng)
+        out.append(res)
+    return out
+
+
+def enforce_formation_and_build_teams(players: List[Dict[str, Any]], team_count: int, formation: Dict[str, int], team_size: int, subs: int = 0, rng: Any = random) -> List[Dict[str, Any]]:
+    pool = PlayerPool(players)
+    report: List[Dict[str, Any]] = []
+    teams = assign_formation(pool, team_count, formation, team_size, subs, rng, report)
+    out = [{"starters": starters} for starters in pool.rebuild(teams)]
+    for issue in report:
+        out[issue["team"]].setdefault("unmet", []).append(issue)
+    return out
+
+
+def matchday_count(team_count: int, double: bool = False) -> int:
+    if team_count < 2:
+        return 0
+    rounds = team_count - 1 + team_count % 2
+    return rounds * 2 if double else rounds
+
+
+def round_robin_matchday(team_count: int, day: int, double: bool = False) -> List[Tuple[int, int]]:
+    # Circle method, computed directly for one matchday in O(n): one slot stays
+    # fixed while the others rotate a step per day. With an odd count the fixed
+    # slot is a phantom and whoever draws it rests. Alternating who hosts by
+    # slot and day keeps every team's home count within one of its away count.
+    # The second leg replays the first with venues swapped, starting one
+    # matchday in: replaying it in order would give every team three home
+    # (or away) games in a row across the turn of the legs.
+    n = team_count + team_count % 2
+    rounds = n - 1
+    second_leg = double and day >= rounds
+    r = (day + 1) % rounds if second_leg else day
+    ring = list(range(n - 1))
+    if r:
+        ring = ring[-r:] + ring[:-r]
+    slots = [n - 1] + ring
+    fixtures = []
+    for i in range(n // 2):
+        home, away = slots[i], slots[n - 1 - i]
+        if (r % 2 == 1) if i == 0 else (i % 2 == 1):
+            home, away = away, home
+        if second_leg:
+            home, away = away, home
+        if home < team_count and away < team_count:
+            fixtures.append((home, away))
+    return fixtures
+
+
+def iter_round_robin(team_count: int, double: bool = False, start: int = 0, stop: Optional[int] = None) -> Iterator[Tuple[int, List[Tuple[int, int]]]]:
+    # Lazily yields (matchday, fixtures); no team plays twice on a matchday
+    total = matchday_count(team_count, double)
+    for day in range(max(0, start), total if stop is None else min(stop, total)):
+        yield day, round_robin_matchday(team_count, day, double)
+
+
+def create_schedule_list(teams: List[Dict[str, Any]], double: bool = False) -> List[Dict[str, Any]]:
     # Return pairings as indices so frontend can resolve names from teams array
-    n = len(teams)
     schedule = []
-    for i in range(n):
-        for j in range(i + 1, n):
-            schedule.append({"teamA": i, "teamB": j})
+    for day, fixtures in iter_round_robin(len(teams), double):
+        for home, away in fixtures:
+            schedule.append({"teamA": home, "teamB": away, "matchday": day + 1})
     return schedule
 
 
-def generate_knockout(teams):
+def generate_knockout(teams, rng: Any = random):
     # Generate knockout bracket using indices for teams, with random seeding
-    import random
     n = len(teams)
 
     # randomized seeding order (indices)
     order = list(range(n))
-    random.shuffle(order)
+    rng.shuffle(order)
 
     # next power of two
     pow2 = 1
@@ -331,6 +1384,9 @@ def generate_knockout(teams):
                 "matchId": match_id,
                 "teamA": f"Winner of Match {left['matchId']}",
                 "teamB": f"Winner of Match {right['matchId']}",
+                # structured form of the labels above
+                "sourceA": {"winnerOf": left["matchId"]},
+                "sourceB": {"winnerOf": right["matchId"]},
                 "winner": None
             })
             match_id += 1
@@ -342,9 +1398,456 @@ def generate_knockout(teams):
 
 
 
-@app.post("/generate")
-async def generate(request: Request) -> Dict[str, Any]:
-    data = await request.json()
+# Whole-tournament Monte Carlo
+MAX_TOURNAMENT_RUNS = 1_000_000
+# Below this many runs per worker the process hop costs more than it saves
+MIN_RUNS_PER_WORKER = 2000
+# Cap on simulated matches (runs x fixtures per run) for one request
+MAX_TOURNAMENT_MATCHES = 20_000_000
+SIM_WORKERS = int(os.environ.get("FOOTBOT_SIM_WORKERS", os.cpu_count() or 1))
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=max(1, SIM_WORKERS), mp_context=POOL_CONTEXT)
+    return _process_pool
+
+
+def goal_rate_matrix(strengths: np.ndarray, base: float = 1.0) -> Tuple[np.ndarray, np.ndarray]:
+    # rates[i, j] is team i's scoring rate against team j (goal_rates, vectorised);
+    # edge[i, j] is logistic_prob(i, j, k=3), used to settle drawn knockout ties
+    a = strengths[:, None]
+    b = strengths[None, :]
+    total = a + b
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        factor = 1.0 + (1.0 / (1.0 + np.exp(-(a - b) / 2.0)) - 0.5)
+        rates = np.maximum(0.05, base * factor * (1.5 * a / total))
+        edge = 1.0 / (1.0 + np.exp(-(a - b) / np.maximum(1.0, total / 2.0) * 3.0))
+    rates = np.where(total <= 0, base, rates)
+    return rates, edge
+
+
+def knockout_slots(bracket: Optional[List[List[Dict[str, Any]]]], team_count: int) -> Optional[List[int]]:
+    # First-round seeding from a generate_knockout bracket, BYEs as -1
+    if not bracket:
+        return None
+    slots = []
+    for match in bracket[0]:
+        for side in ("teamA", "teamB"):
+            t = match.get(side)
+            slots.append(t if isinstance(t, int) and 0 <= t < team_count else -1)
+    return slots
+
+
+def simulate_knockout_runs(strengths: np.ndarray, slots: Optional[List[int]], runs: int, rng: np.random.Generator, base: float = 1.0) -> Dict[str, np.ndarray]:
+    n = len(strengths)
+    rates, edge = goal_rate_matrix(strengths, base)
+    pow2 = 1
+    while pow2 < n:
+        pow2 <<= 1
+
+    if slots is not None:
+        cur = np.tile(np.asarray(slots, dtype=np.int64), (runs, 1))
+    else:
+        # Random seeding per run, BYEs padded at the end as generate_knockout does
+        seeded = rng.permuted(np.tile(np.arange(n, dtype=np.int64), (runs, 1)), axis=1)
+        cur = np.concatenate([seeded, np.full((runs, pow2 - n), -1, dtype=np.int64)], axis=1)
+
+    semi = np.zeros(n, dtype=np.int64)
+    final = np.zeros(n, dtype=np.int64)
+    reached_semi = reached_final = False
+    while True:
+        width = cur.shape[1]
+        if width <= 4 and not reached_semi:
+            semi += np.bincount(cur[cur >= 0], minlength=n)
+            reached_semi = True
+        if width <= 2 and not reached_final:
+            final += np.bincount(cur[cur >= 0], minlength=n)
+            reached_final = True
+        if width == 1:
+            break
+        a = cur[:, 0::2]
+        b = cur[:, 1::2]
+        played = (a >= 0) & (b >= 0)
+        ia = np.where(played, a, 0)
+        ib = np.where(played, b, 0)
+        goalsA = rng.poisson(rates[ia, ib])
+        goalsB = rng.poisson(rates[ib, ia])
+        # Level after full time: decide on a coin weighted by the strength edge
+        a_wins = (goalsA > goalsB) | ((goalsA == goalsB) & (rng.random(a.shape) < edge[ia, ib]))
+        # BYE propagation: an unopposed side goes through
+        cur = np.where(played, np.where(a_wins, a, b), np.maximum(a, b))
+
+    winners = cur[:, 0]
+    title = np.bincount(winners[winners >= 0], minlength=n)
+    return {"title": title, "final": final, "semi_final": semi}
+
+
+def simulate_league_runs(strengths: np.ndarray, runs: int, rng: np.random.Generator, base: float = 1.0) -> Dict[str, np.ndarray]:
+    n = len(strengths)
+    rates, _ = goal_rate_matrix(strengths, base)
+    home, away = np.triu_indices(n, k=1)
+    title = np.zeros(n, dtype=np.int64)
+    points_total = np.zeros(n, dtype=np.float64)
+    # Keep the goals matrices to a few million cells at a time
+    batch = max(1, 2_000_000 // max(1, len(home)))
+    for start in range(0, runs, batch):
+        m = min(batch, runs - start)
+        goalsA = rng.poisson(rates[home, away], (m, len(home)))
+        goalsB = rng.poisson(rates[away, home], (m, len(home)))
+        ptsA = np.where(goalsA > goalsB, 3, np.where(goalsA == goalsB, 1, 0))
+        ptsB = np.where(goalsB > goalsA, 3, np.where(goalsA == goalsB, 1, 0))
+        offsets = (np.arange(m, dtype=np.int64) * n)[:, None]
+        cells = m * n
+
+        def table(x, y):
+            return (np.bincount((home + offsets).ravel(), weights=x.ravel(), minlength=cells)
+                    + np.bincount((away + offsets).ravel(), weights=y.ravel(), minlength=cells)).reshape(m, n)
+
+        points = table(ptsA, ptsB)
+        goal_diff = table(goalsA - goalsB, goalsB - goalsA)
+        goals_for = table(goalsA, goalsB)
+        # Points, then goal difference, then goals scored, then lots
+        ranking = np.lexsort((rng.random((m, n)), goals_for, goal_diff, points), axis=-1)
+        title += np.bincount(ranking[:, -1], minlength=n)
+        points_total += points.sum(axis=0)
+    return {"title": title, "points": points_total}
+
+
+def run_tournament_chunk(kind: str, strengths: List[float], slots: Optional[List[int]], runs: int, seed: np.random.SeedSequence, base: float = 1.0) -> Dict[str, List[float]]:
+    # Process-pool entry point: one independent RNG stream per chunk
+    rng = np.random.default_rng(seed)
+    arr = np.asarray(strengths, dtype=np.float64)
+    if kind == "knockout":
+        out = simulate_knockout_runs(arr, slots, runs, rng, base)
+    else:
+        out = simulate_league_runs(arr, runs, rng, base)
+    return {k: v.tolist() for k, v in out.items()}
+
+
+def tournament_run_limit(kind: str, team_count: int, runs: int) -> int:
+    # Large fields get fewer runs so the total work stays bounded
+    if kind == "knockout":
+        per_run = 1 << max(0, (team_count - 1).bit_length())
+    else:
+        per_run = team_count * (team_count - 1) // 2
+    return max(1, min(runs, MAX_TOURNAMENT_MATCHES // max(1, per_run)))
+
+
+async def simulate_tournament_runs(kind: str, strengths: List[float], slots: Optional[List[int]], runs: int, seed: Optional[int] = None, base: float = 1.0, workers: int = SIM_WORKERS) -> Dict[str, np.ndarray]:
+    chunks = max(1, min(workers, runs // MIN_RUNS_PER_WORKER))
+    seeds = np.random.SeedSequence(seed).spawn(chunks)
+    sizes = [runs // chunks + (1 if i < runs % chunks else 0) for i in range(chunks)]
+    loop = asyncio.get_running_loop()
+    # A single chunk stays in-process but still off the event loop
+    pool = get_process_pool() if chunks > 1 else None
+    parts = await asyncio.gather(*[
+        loop.run_in_executor(pool, run_tournament_chunk, kind, strengths, slots, size, s, base)
+        for size, s in zip(sizes, seeds)
+    ])
+    return {k: np.sum([p[k] for p in parts], axis=0) for k in parts[0]}
+
+
+# Instrumentation: Prometheus text exposition at /metrics
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STEP_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+FITNESS_BUCKETS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 1000, 10000)
+
+
+class Metrics:
+    # Counters, gauges and fixed-bucket histograms keyed by (name, labels).
+    # Recording is a dict update and a bisect under one lock.
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counters: Dict[Tuple[str, Tuple], float] = {}
+        self.gauges: Dict[Tuple[str, Tuple], float] = {}
+        self.histograms: Dict[Tuple[str, Tuple], List[Any]] = {}
+        self.help: Dict[str, Tuple[str, str]] = {}
+
+    def describe(self, name: str, kind: str, text: str) -> None:
+        self.help[name] = (kind, text)
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels: Any) -> None:
+        with self._lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def clear_gauge(self, name: str) -> None:
+        with self._lock:
+            for key in [k for k in self.gauges if k[0] == name]:
+                del self.gauges[key]
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **labels: Any) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            h = self.histograms.get(key)
+            if h is None:
+                h = self.histograms[key] = [buckets, [0] * len(buckets), 0.0, 0]
+            i = bisect.bisect_left(buckets, value)
+            if i < len(buckets):
+                h[1][i] += 1
+            h[2] += value
+            h[3] += 1
+
+    def render(self) -> str:
+        def fmt(labels: Tuple, extra: Tuple = ()) -> str:
+            items = labels + extra
+            if not items:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+        lines: List[str] = []
+        seen = set()
+
+        def header(name: str, default_kind: str) -> None:
+            if name in seen:
+                return
+            seen.add(name)
+            kind, text = self.help.get(name, (default_kind, ""))
+            if text:
+                lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                header(name, "counter")
+                lines.append(f"{name}{fmt(labels)} {value:g}")
+            for (name, labels), value in sorted(self.gauges.items()):
+                header(name, "gauge")
+                lines.append(f"{name}{fmt(labels)} {value:g}")
+            for (name, labels), (buckets, counts, total, count) in sorted(self.histograms.items(), key=lambda kv: kv[0]):
+                header(name, "histogram")
+                cumulative = 0
+                for bound, c in zip(buckets, counts):
+                    cumulative += c
+                    lines.append(f"{name}_bucket{fmt(labels, (('le', f'{bound:g}'),))} {cumulative}")
+                lines.append(f"{name}_bucket{fmt(labels, (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{fmt(labels)} {total:g}")
+                lines.append(f"{name}_count{fmt(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+metrics.describe("footbot_request_seconds", "histogram", "Request latency by route.")
+metrics.describe("footbot_requests_total", "counter", "Requests by route and status code.")
+metrics.describe("footbot_generate_stage_seconds", "histogram", "Time spent in each /generate stage.")
+metrics.describe("footbot_optimizer_steps", "histogram", "Local search steps run per split.")
+metrics.describe("footbot_optimizer_final_fitness", "histogram", "fitness_formation of the returned split.")
+metrics.describe("footbot_optimizer_improvement_ratio", "histogram", "Final fitness over the best starting deal.")
+metrics.describe("footbot_optimizer_last_best_fitness", "gauge", "Best-fitness trajectory of the most recent split, by step.")
+metrics.describe("footbot_generate_fallback_total", "counter", "Times the formation builder replaced the split search.")
+metrics.describe("footbot_exact_cache_hits", "gauge", "Exact-mode scoreline lookups served from the memo.")
+metrics.describe("footbot_exact_cache_misses", "gauge", "Exact-mode scoreline matrices built from scratch.")
+metrics.describe("footbot_exact_cache_entries", "gauge", "Scoreline summaries currently memoised.")
+
+
+def add_stage(telemetry: Optional[Dict[str, Any]], stage: str, seconds: float) -> None:
+    if telemetry is not None:
+        stages = telemetry.setdefault("stages", {})
+        stages[stage] = stages.get(stage, 0.0) + seconds
+
+
+def record_generate_telemetry(telemetry: Dict[str, Any]) -> None:
+    # Runs in the API process with what the worker measured
+    for stage, seconds in telemetry.get("stages", {}).items():
+        metrics.observe("footbot_generate_stage_seconds", seconds, stage=stage)
+    if telemetry.get("fallbacks"):
+        metrics.inc("footbot_generate_fallback_total", telemetry["fallbacks"])
+    runs = telemetry.get("optimizer", [])
+    for run in runs:
+        metrics.observe("footbot_optimizer_steps", run["steps"], buckets=STEP_BUCKETS)
+        metrics.observe("footbot_optimizer_final_fitness", run["final_fitness"], buckets=FITNESS_BUCKETS)
+        if run["population_best"] > 0:
+            metrics.observe("footbot_optimizer_improvement_ratio", run["final_fitness"] / run["population_best"],
+                            buckets=(0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99, 1.0))
+    if runs:
+        metrics.clear_gauge("footbot_optimizer_last_best_fitness")
+        for step, best in runs[-1]["trajectory"]:
+            metrics.set("footbot_optimizer_last_best_fitness", best, step=step)
+
+
+def run_generate_job(build: Callable[..., Dict[str, Any]], data: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    # Worker entry point: the response plus the telemetry gathered building it
+    telemetry: Dict[str, Any] = {}
+    return build(data, telemetry), telemetry
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    # Label by route template so path parameters don't explode cardinality
+    path = getattr(route, "path", "unmatched")
+    metrics.observe("footbot_request_seconds", time.perf_counter() - start, route=path)
+    metrics.inc("footbot_requests_total", route=path, status=response.status_code)
+    return response
+
+
+@app.get("/metrics")
+def metrics_endpoint() -> Response:
+    info = scoreline_summary.cache_info()
+    metrics.set("footbot_exact_cache_hits", info.hits)
+    metrics.set("footbot_exact_cache_misses", info.misses)
+    metrics.set("footbot_exact_cache_entries", info.currsize)
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+# Result cache for seeded (deterministic) /generate and /simulate requests
+CACHE_MAX_ENTRIES = int(os.environ.get("FOOTBOT_CACHE_ENTRIES", 256))
+CACHE_TTL = float(os.environ.get("FOOTBOT_CACHE_TTL", 600))
+CACHE_MAX_BYTES = int(float(os.environ.get("FOOTBOT_CACHE_MB", 64)) * 1024 * 1024)
+
+
+class ResultCache:
+    # LRU with a per-entry TTL and a byte budget. Values are encoded JSON bodies,
+    # so an entry's size is exact and a hit is served without re-serialising.
+    # Identical requests that arrive while one is computing await the same future.
+    def __init__(self, max_entries: int, ttl: float, max_bytes: int) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._inflight: Dict[str, "asyncio.Task[bytes]"] = {}
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: str, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (time.monotonic() + self.ttl, body)
+        self.bytes += len(body)
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: str) -> None:
+        _, body = self._entries.pop(key)
+        self.bytes -= len(body)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[bytes]]) -> bytes:
+        body = self.get(key)
+        if body is not None:
+            return body
+        # The compute task itself is shared and shielded, so a cancelled
+        # caller (leader or not) never cancels or strands the others
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fill(key, compute))
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _fill(self, key: str, compute: Callable[[], Awaitable[bytes]]) -> bytes:
+        try:
+            body = await compute()
+        finally:
+            del self._inflight[key]
+        self.put(key, body)
+        return body
+
+
+result_cache = ResultCache(CACHE_MAX_ENTRIES, CACHE_TTL, CACHE_MAX_BYTES)
+
+
+def canonical_json(payload: Any) -> bytes:
+    # Key order and whitespace in the request don't matter
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS, default=str)
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def request_key(kind: str, payload: Any) -> str:
+    return kind + ":" + hashlib.sha256(canonical_json(payload)).hexdigest()
+
+
+def encode_json(result: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(result, separators=(",", ":")).encode("utf-8")
+
+
+def json_response(result: Any) -> Response:
+    # Encode once ourselves instead of going through FastAPI's jsonable_encoder
+    return Response(content=encode_json(result), media_type="application/json")
+
+
+async def read_json(request: Request) -> Any:
+    body = await request.body()
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+
+# Player pools behind compact responses, so later requests can name rosters
+# by index and send a hash instead of the players
+POOL_STORE_ENTRIES = int(os.environ.get("FOOTBOT_POOL_ENTRIES", 256))
+player_pools: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+_pools_lock = threading.Lock()
+
+
+def remember_pool(players: List[Dict[str, Any]]) -> str:
+    pool_hash = hashlib.sha256(canonical_json(players)).hexdigest()[:32]
+    with _pools_lock:
+        player_pools[pool_hash] = players
+        player_pools.move_to_end(pool_hash)
+        while len(player_pools) > POOL_STORE_ENTRIES:
+            player_pools.popitem(last=False)
+    return pool_hash
+
+
+def recall_pool(pool_hash: str) -> Optional[List[Dict[str, Any]]]:
+    with _pools_lock:
+        players = player_pools.get(pool_hash)
+        if players is not None:
+            player_pools.move_to_end(pool_hash)
+        return players
+
+
+def expand_teams(data: Dict[str, Any]) -> Any:
+    # Compact requests give each team as player indices (a list, or
+    # {"players": [...]}) into a pool sent inline as `players` or named by the
+    # `poolHash` a compact /generate returned. Returns the request with full
+    # rosters, or an error response.
+    if "poolHash" not in data and data.get("format") != "compact":
+        return data
+    players = data.get("players")
+    if "poolHash" in data:
+        players = recall_pool(str(data["poolHash"]))
+        if players is None:
+            return JSONResponse({"error": "unknown pool, resend it as players", "poolHash": data["poolHash"]}, status_code=404)
+    players = players or []
+    teams = []
+    try:
+        for i, t in enumerate(data.get("teams") or []):
+            team = t if isinstance(t, dict) else {"players": t}
+            teams.append(dict(team, players=[players[k] for k in team.get("players") or []], name=team.get("name") or f"Team {i + 1}"))
+    except (IndexError, TypeError):
+        return JSONResponse({"error": "team refers to a player outside the pool"}, status_code=400)
+    return dict(data, teams=teams)
+
+
+def request_seed(data: Dict[str, Any]) -> Optional[int]:
+    seed = data.get("seed")
+    return None if seed is None else int(seed)
+
+
+def generate_params(data: Dict[str, Any]) -> Dict[str, Any]:
     players = data.get("players", [])
     team_count = int(data.get("teamCount", 2))
     team_size = int(data.get("teamSize", max(5, len(players) // team_count)))
@@ -353,37 +1856,277 @@ async def generate(request: Request) -> Dict[str, Any]:
     # Subs are no longer provided by frontend and are not required.
     subs = 0
     tournament_type = data.get("tournamentType", "round-robin")
+    # Optional anytime mode: search until the budget runs out, then return the best split
+    budget_ms = data.get("timeBudgetMs")
+    time_budget = None if budget_ms is None else min(float(budget_ms), MAX_TIME_BUDGET_MS) / 1000.0
+    # Optional parallel mode: this many island searches, run across cores
+    islands = max(1, min(int(data.get("islands") or 1), MAX_ISLANDS))
+    # "compact": teams reference players by index into the input list
+    compact = data.get("format") == "compact"
+    # "schedule": false skips the fixture list (it can be paged from /schedule)
+    schedule = data.get("schedule", True) is not False
 
     formation = parse_formation(formation_input, team_size)
-
-    teams_players = genetic_multi_split(players, team_count)
-    if not teams_players or len(teams_players) != team_count:
+    return {"team_count": team_count, "team_size": team_size, "formation": formation, "subs": subs,
+            "tournament_type": tournament_type, "time_budget": time_budget, "islands": islands, "compact": compact,
+            "schedule": schedule}
+
+
+def draw_teams(pool: PlayerPool, params: Dict[str, Any], rng: Any, telemetry: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    team_count = params["team_count"]
+    tournament_type = params["tournament_type"]
+    opt_stats: Optional[Dict[str, Any]] = {} if telemetry is not None else None
+    unmet: List[Dict[str, Any]] = []
+    t0 = time.perf_counter()
+    teams_idx = optimise_split_islands(pool, team_count, params["islands"], rng=rng, time_budget=params["time_budget"], stats=opt_stats)
+    add_stage(telemetry, "split", time.perf_counter() - t0)
+    if opt_stats:
+        telemetry.setdefault("optimizer", []).append(opt_stats)
+    if not teams_idx or len(teams_idx) != team_count:
         # fallback deterministic builder
-        built = enforce_formation_and_build_teams(players, team_count, formation, team_size, subs)
-        teams_players = [t["starters"] for t in built]
+        t0 = time.perf_counter()
+        teams_idx = assign_formation(pool, team_count, params["formation"], params["team_size"], params["subs"], rng, unmet)
+        add_stage(telemetry, "fallback", time.perf_counter() - t0)
+        if telemetry is not None:
+            telemetry["fallbacks"] = telemetry.get("fallbacks", 0) + 1
 
+    t0 = time.perf_counter()
+
+    # Captain flags go on copies so draws sharing a pool don't leak into each other
+    players = pool.players
     teams_out = []
-    for team_players in teams_players:
-        captains = [p for p in team_players if p.get("captain")]
-        if not captains and team_players:
-            captain = max(team_players, key=lambda x: score_map.get(x.get("level"), 1))
-            captain["captain"] = True
+    for members in teams_idx:
+        if params["compact"]:
+            captain = next((i for i in members if pool.captain[i]), None)
+            if captain is None and members:
+                captain = max(members, key=pool.rating.__getitem__)
+            teams_out.append({"players": list(members), "captain": captain, "name": ""})
+            continue
+        team_players = [players[i] for i in members]
+        if members and not any(pool.captain[i] for i in members):
+            captain = max(range(len(members)), key=lambda k: pool.rating[members[k]])
+            team_players[captain] = dict(team_players[captain], captain=True)
         teams_out.append({"players": team_players, "name": ""})
+    add_stage(telemetry, "captains", time.perf_counter() - t0)
 
+    t0 = time.perf_counter()
     schedule = []
-    if team_count > 1:
+    schedule_page = None
+    if team_count > 1 and params["schedule"]:
         if tournament_type == "knockout":
-            schedule = generate_knockout(teams_out)
-        else:
+            schedule = generate_knockout(teams_out, rng)
+        elif team_count <= GENERATE_SCHEDULE_TEAMS:
             schedule = create_schedule_list(teams_out)
+        else:
+            # Large leagues get the first page only, shaped like /schedule's
+            total = matchday_count(team_count)
+            size = min(GENERATE_SCHEDULE_PAGE, total)
+            schedule = [{"teamA": home, "teamB": away, "matchday": day + 1}
+                        for day, fixtures in iter_round_robin(team_count, stop=size) for home, away in fixtures]
+            schedule_page = {"teamCount": team_count, "matchdays": total, "page": 0, "pageSize": size,
+                             "nextPage": 1 if size < total else None}
+    add_stage(telemetry, "schedule", time.perf_counter() - t0)
+
+    out = {"teams": teams_out, "schedule": schedule}
+    if schedule_page is not None:
+        out["schedulePage"] = schedule_page
+    if unmet:
+        out["unmet"] = unmet
+    return out
+
+
+def build_generate_response(data: Dict[str, Any], telemetry: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    # Per-request RNG: a seed makes the draw reproducible, and no request
+    # touches the module-global random state. The pool is parsed once and
+    # everything below works on player indices.
+    params = generate_params(data)
+    t0 = time.perf_counter()
+    pool = PlayerPool(data.get("players", []))
+    add_stage(telemetry, "pool", time.perf_counter() - t0)
+    return draw_teams(pool, params, random.Random(request_seed(data)), telemetry)
+
+
+def build_generate_batch(data: Dict[str, Any], telemetry: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    # Several independent draws of one pool, parsed once
+    params = generate_params(data)
+    t0 = time.perf_counter()
+    pool = PlayerPool(data.get("players", []))
+    add_stage(telemetry, "pool", time.perf_counter() - t0)
+    draws = []
+    seeds = batch_seeds(data)
+    # timeBudgetMs bounds the whole batch: each draw gets an even share of
+    # what is left, so one request holds a worker for at most the cap
+    deadline = None if params["time_budget"] is None else time.perf_counter() + params["time_budget"]
+    for k, seed in enumerate(seeds):
+        if deadline is not None:
+            params["time_budget"] = max(0.0, deadline - time.perf_counter()) / (len(seeds) - k)
+        draw = draw_teams(pool, params, random.Random(seed), telemetry)
+        draw["seed"] = seed
+        draws.append(draw)
+    return {"draws": draws}
+
+
+def batch_seeds(data: Dict[str, Any]) -> List[Optional[int]]:
+    seeds = data.get("seeds")
+    if seeds is not None:
+        return [None if s is None else int(s) for s in seeds][:MAX_GENERATE_DRAWS]
+    return [None] * max(1, min(int(data.get("draws") or 1), MAX_GENERATE_DRAWS))
+
+
+# Team generation runs off the event loop on a bounded pool
+GENERATE_EXECUTOR = os.environ.get("FOOTBOT_GENERATE_EXECUTOR", "process")
+GENERATE_WORKERS = int(os.environ.get("FOOTBOT_GENERATE_WORKERS", os.cpu_count() or 1))
+# Requests allowed to wait for a worker before new ones are turned away
+GENERATE_QUEUE = int(os.environ.get("FOOTBOT_GENERATE_QUEUE", 8))
+GENERATE_RETRY_AFTER = 2
+MAX_TIME_BUDGET_MS = 30_000
+MAX_GENERATE_DRAWS = 64
+# Above this many teams a round-robin /generate returns only the first
+# GENERATE_SCHEDULE_PAGE matchdays; the rest is paged from /schedule
+GENERATE_SCHEDULE_TEAMS = 64
+GENERATE_SCHEDULE_PAGE = 10
+
+_generate_pool: Optional[Executor] = None
+_island_pool: Optional[Executor] = None
+_generate_inflight = 0
+
+
+class GeneratorBusy(Exception):
+    pass
+
+
+def get_generate_pool() -> Executor:
+    global _generate_pool
+    if _generate_pool is None:
+        workers = max(1, GENERATE_WORKERS)
+        if GENERATE_EXECUTOR == "thread":
+            _generate_pool = ThreadPoolExecutor(max_workers=workers)
+        else:
+            _generate_pool = ProcessPoolExecutor(max_workers=workers, mp_context=POOL_CONTEXT)
+    return _generate_pool
+
+
+def get_island_pool() -> Executor:
+    # Island searches fan out over every core themselves, so they queue here
+    # instead of running GENERATE_WORKERS at a time
+    global _island_pool
+    if _island_pool is None:
+        workers = max(1, ISLAND_SEARCHES)
+        if GENERATE_EXECUTOR == "thread":
+            _island_pool = ThreadPoolExecutor(max_workers=workers)
+        else:
+            _island_pool = ProcessPoolExecutor(max_workers=workers, mp_context=POOL_CONTEXT)
+    return _island_pool
 
-    return {"teams": teams_out, "schedule": schedule}
 
+async def offload_generate(data: Dict[str, Any], build: Callable[..., Dict[str, Any]] = build_generate_response) -> Dict[str, Any]:
+    # The counter is only touched on the event loop thread, so no lock is needed
+    global _generate_inflight
+    if _generate_inflight >= max(1, GENERATE_WORKERS) + GENERATE_QUEUE:
+        raise GeneratorBusy()
+    _generate_inflight += 1
+    try:
+        loop = asyncio.get_running_loop()
+        pool = get_island_pool() if int(data.get("islands") or 1) > 1 else get_generate_pool()
+        result, telemetry = await loop.run_in_executor(pool, run_generate_job, build, data)
+        record_generate_telemetry(telemetry)
+        return result
+    finally:
+        _generate_inflight -= 1
+
+
+def busy_response() -> JSONResponse:
+    return JSONResponse(
+        {"error": "team generator is busy, retry shortly"},
+        status_code=503,
+        headers={"Retry-After": str(GENERATE_RETRY_AFTER)},
+    )
+
+
+def with_pool_hash(result: Dict[str, Any], pool_hash: Optional[str]) -> Dict[str, Any]:
+    if pool_hash is not None:
+        result["poolHash"] = pool_hash
+    return result
 
 
-@app.post("/simulate")
-async def simulate(request: Request) -> Dict[str, Any]:
-    data = await request.json()
+def team_count_error(data: Dict[str, Any]) -> Optional[Response]:
+    team_count = int(data.get("teamCount", 2))
+    if not 1 <= team_count <= MAX_SCHEDULE_TEAMS:
+        return JSONResponse({"error": f"teamCount must be between 1 and {MAX_SCHEDULE_TEAMS}"}, status_code=400)
+    return None
+
+
+@app.post("/generate")
+async def generate(request: Request) -> Any:
+    t0 = time.perf_counter()
+    data = await read_json(request)
+    metrics.observe("footbot_generate_stage_seconds", time.perf_counter() - t0, stage="parse")
+    invalid = team_count_error(data)
+    if invalid is not None:
+        return invalid
+    pool_hash = remember_pool(data.get("players", [])) if data.get("format") == "compact" else None
+    try:
+        if data.get("seed") is None:
+            return json_response(with_pool_hash(await offload_generate(data), pool_hash))
+
+        key = request_key("generate", {f: data.get(f) for f in ("players", "teamCount", "teamSize", "tournamentType", "seed", "timeBudgetMs", "islands", "format", "schedule")})
+
+        async def compute() -> bytes:
+            return encode_json(with_pool_hash(await offload_generate(data), pool_hash))
+
+        body = await result_cache.get_or_compute(key, compute)
+    except GeneratorBusy:
+        return busy_response()
+    return Response(content=body, media_type="application/json")
+
+
+@app.post("/generate/batch")
+async def generate_batch(request: Request) -> Any:
+    # Independent draws of the same pool (e.g. one per seed) in a single job
+    data = await read_json(request)
+    invalid = team_count_error(data)
+    if invalid is not None:
+        return invalid
+    pool_hash = remember_pool(data.get("players", [])) if data.get("format") == "compact" else None
+    try:
+        if any(s is None for s in batch_seeds(data)):
+            return json_response(with_pool_hash(await offload_generate(data, build_generate_batch), pool_hash))
+
+        key = request_key("generate/batch", {f: data.get(f) for f in ("players", "teamCount", "teamSize", "tournamentType", "seeds", "timeBudgetMs", "islands", "format", "schedule")})
+
+        async def compute() -> bytes:
+            return encode_json(with_pool_hash(await offload_generate(data, build_generate_batch), pool_hash))
+
+        body = await result_cache.get_or_compute(key, compute)
+    except GeneratorBusy:
+        return busy_response()
+    return Response(content=body, media_type="application/json")
+
+
+@app.post("/rebalance")
+async def rebalance(request: Request) -> Any:
+    # Patch existing teams for late arrivals and dropouts with as few moves as
+    # possible, instead of re-running the whole split
+    data = await read_json(request)
+    teams = data.get("teams") or []
+    if not teams:
+        return JSONResponse({"error": "teams are required"}, status_code=400)
+    max_moves = max(0, min(int(data.get("maxMoves", MAX_REBALANCE_MOVES)), 10 * MAX_REBALANCE_MOVES))
+    min_gain = float(data.get("minGain", REBALANCE_MIN_GAIN))
+    result = await asyncio.get_running_loop().run_in_executor(
+        None, rebalance_teams, teams, data.get("added") or [], data.get("removed") or [], max_moves, min_gain)
+    return json_response(result)
+
+
+def sim_mode(data: Dict[str, Any]) -> Tuple[str, int]:
+    mode = "exact" if data.get("mode") == "exact" else "sample"
+    max_goals = max(1, min(int(data.get("maxGoals") or EXACT_MAX_GOALS), MAX_EXACT_GOALS))
+    return mode, max_goals
+
+
+def run_simulation(data: Dict[str, Any]) -> Dict[str, Any]:
+    seed = request_seed(data)
+    rng = random.Random(seed)
     # Accept either indices (teamA: 0) or full team objects
     teamA = data.get("teamA")
     teamB = data.get("teamB")
@@ -391,18 +2134,22 @@ async def simulate(request: Request) -> Dict[str, Any]:
     # If teamA/teamB are indices (numbers or Team strings), try to resolve from provided teams list
     teams = data.get("teams") or []
     def resolve(t):
-        if isinstance(t, int):
-            return teams[t] if 0 <= t < len(teams) else {}
-        if isinstance(t, str):
-            m = None
-            import re
-            m = re.match(r"Team\s*(\d+)", t)
-            if m:
-                idx = int(m.group(1)) - 1
-                return teams[idx] if 0 <= idx < len(teams) else {}
         if isinstance(t, dict):
             return t
-        return {}
+        idx = team_ref_index(t, len(teams))
+        return teams[idx] if idx is not None else {}
+
+    # Optional Monte Carlo replays on top of the single simulated scoreline
+    iterations = max(1, min(int(data.get("iterations") or 1), MAX_SIM_ITERATIONS))
+    # mode "exact" adds the analytic scoreline distribution
+    mode, max_goals = sim_mode(data)
+
+    def with_distribution(res, a_obj, b_obj):
+        if mode == "exact":
+            apply_exact(res, exact_strengths(compute_team_strength(a_obj), compute_team_strength(b_obj), max_goals=max_goals))
+        if iterations > 1:
+            res["monte_carlo"] = simulate_match_monte_carlo(a_obj, b_obj, iterations, rng=np.random.default_rng(seed))
+        return res
 
     # If a bracket/round/match provided, run simulation and advance winner into bracket
     bracket = data.get("bracket")
@@ -421,7 +2168,7 @@ async def simulate(request: Request) -> Dict[str, Any]:
             b_val = match.get("teamB")
             a_obj = resolve(a_val)
             b_obj = resolve(b_val)
-            res = simulate_match(a_obj or {}, b_obj or {})
+            res = with_distribution(simulate_match(a_obj or {}, b_obj or {}, rng=rng), a_obj or {}, b_obj or {})
             # determine winner label
             if res.get("predicted_winner") == "TeamA":
                 winner_label = a_val
@@ -448,5 +2195,454 @@ async def simulate(request: Request) -> Dict[str, Any]:
 
     a_obj = resolve(teamA)
     b_obj = resolve(teamB)
-    result = simulate_match(a_obj, b_obj)
+    result = with_distribution(simulate_match(a_obj, b_obj, rng=rng), a_obj, b_obj)
     return result
+
+
+@app.post("/simulate")
+async def simulate(request: Request) -> Any:
+    data = await read_json(request)
+    full = expand_teams(data)
+    if isinstance(full, Response):
+        return full
+    # Off the loop: up to MAX_SIM_ITERATIONS replays, plus the stats lookup
+    # that resolving team strength may need
+    loop = asyncio.get_running_loop()
+    if data.get("seed") is None:
+        return json_response(await loop.run_in_executor(None, run_simulation, full))
+
+    key = request_key("simulate", data)
+
+    async def compute() -> bytes:
+        return encode_json(await loop.run_in_executor(None, run_simulation, full))
+
+    body = await result_cache.get_or_compute(key, compute)
+    return Response(content=body, media_type="application/json")
+
+
+def run_simulation_batch(data: Dict[str, Any]) -> Dict[str, Any]:
+    teams = data.get("teams") or []
+    bracket = data.get("bracket") or []
+    iterations = max(1, min(int(data.get("iterations") or 1), MAX_SIM_ITERATIONS))
+    seed = request_seed(data)
+
+    # Resolve every fixture to a pair of team indices before simulating anything
+    pairs = []
+    results: List[Optional[Dict[str, Any]]] = []
+    for fx in data.get("fixtures") or []:
+        if isinstance(fx, dict) and "round" in fx and "match" in fx:
+            try:
+                match = bracket[fx["round"]][fx["match"]]
+            except (IndexError, KeyError, TypeError):
+                results.append({"error": "no such bracket match"})
+                continue
+            refs = (match.get("teamA"), match.get("teamB"))
+        elif isinstance(fx, dict):
+            refs = (fx.get("teamA"), fx.get("teamB"))
+        else:
+            refs = tuple(fx)[:2]
+        a = team_ref_index(refs[0], len(teams))
+        b = team_ref_index(refs[1], len(teams))
+        if a is None or b is None:
+            results.append({"error": "fixture teams are not decided yet"})
+            continue
+        pairs.append((a, b))
+        results.append(None)
+
+    strengths = team_strengths(teams)
+    mode, max_goals = sim_mode(data)
+    simulated = iter(simulate_fixtures(strengths, pairs, iterations, rng=np.random.default_rng(seed), mode=mode, max_goals=max_goals))
+    pair_iter = iter(pairs)
+    out = []
+    for res in results:
+        if res is None:
+            a, b = next(pair_iter)
+            res = dict(next(simulated), teamA=a, teamB=b)
+        out.append(res)
+    return {"results": out}
+
+
+@app.post("/simulate/batch")
+async def simulate_batch(request: Request) -> Any:
+    # Many fixtures against one teams array: strengths are resolved once
+    data = await read_json(request)
+    full = expand_teams(data)
+    if isinstance(full, Response):
+        return full
+    iterations = max(1, min(int(data.get("iterations") or 1), MAX_SIM_ITERATIONS))
+    if len(data.get("fixtures") or []) * iterations > MAX_BATCH_SIMULATIONS:
+        return JSONResponse({"error": f"fixtures x iterations must not exceed {MAX_BATCH_SIMULATIONS}"}, status_code=400)
+    loop = asyncio.get_running_loop()
+    if data.get("seed") is None:
+        return json_response(await loop.run_in_executor(None, run_simulation_batch, full))
+
+    key = request_key("simulate/batch", data)
+
+    async def compute() -> bytes:
+        return encode_json(await loop.run_in_executor(None, run_simulation_batch, full))
+
+    body = await result_cache.get_or_compute(key, compute)
+    return Response(content=body, media_type="application/json")
+
+
+MAX_SCHEDULE_PAGE = 100
+MAX_SCHEDULE_TEAMS = 1000
+
+
+@app.get("/schedule")
+def schedule(teamCount: int, double: bool = False, page: int = 0, pageSize: Optional[int] = None, format: str = "json") -> Any:
+    # Round-robin fixtures by matchday, paged or streamed as NDJSON. Each
+    # matchday is computed on demand, so nothing holds the full schedule.
+    if teamCount > MAX_SCHEDULE_TEAMS:
+        return JSONResponse({"error": f"teamCount must not exceed {MAX_SCHEDULE_TEAMS}"}, status_code=400)
+    total = matchday_count(teamCount, double)
+    if format == "ndjson":
+        # One fixture per line; without pageSize the whole schedule streams
+        start = max(0, page) * pageSize if pageSize else 0
+        stop = start + pageSize if pageSize else None
+
+        def lines() -> Iterator[bytes]:
+            for day, fixtures in iter_round_robin(teamCount, double, start, stop):
+                for home, away in fixtures:
+                    yield encode_json({"matchday": day + 1, "teamA": home, "teamB": away}) + b"\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    size = max(1, min(pageSize or 10, MAX_SCHEDULE_PAGE))
+    start = max(0, page) * size
+    matchdays = [{"matchday": day + 1, "fixtures": [{"teamA": h, "teamB": a} for h, a in fixtures]}
+                 for day, fixtures in iter_round_robin(teamCount, double, start, start + size)]
+    return {"teamCount": teamCount, "double": double, "matchdays": total, "page": page, "pageSize": size,
+            "items": matchdays, "nextPage": page + 1 if start + size < total else None}
+
+
+@app.post("/simulate/tournament")
+async def simulate_tournament(request: Request) -> Any:
+    data = expand_teams(await read_json(request))
+    if isinstance(data, Response):
+        return data
+    teams = data.get("teams") or []
+    tournament_type = data.get("tournamentType", "round-robin")
+    runs = max(1, min(int(data.get("runs") or 10000), MAX_TOURNAMENT_RUNS))
+    seed = request_seed(data)
+    if len(teams) < 2:
+        return JSONResponse({"error": "need at least two teams"}, status_code=400)
+
+    # The stats lookup may wait on SQLite, so it stays off the loop too
+    strengths = await asyncio.get_running_loop().run_in_executor(None, team_strengths, teams)
+    slots = knockout_slots(data.get("bracket"), len(teams)) if tournament_type == "knockout" else None
+    kind = "knockout" if tournament_type == "knockout" else "league"
+    runs = tournament_run_limit(kind, len(teams), runs)
+    totals = await simulate_tournament_runs(kind, strengths, slots, runs, seed=seed)
+
+    out = []
+    for i, t in enumerate(teams):
+        row = {"team": i, "name": t.get("name", ""), "strength": strengths[i], "title_probability": float(totals["title"][i] / runs)}
+        if kind == "knockout":
+            row["final_probability"] = float(totals["final"][i] / runs)
+            row["semi_final_probability"] = float(totals["semi_final"][i] / runs)
+        else:
+            row["expected_points"] = float(totals["points"][i] / runs)
+        out.append(row)
+    return {"tournamentType": tournament_type, "runs": runs, "teams": out}
+
+
+@app.post("/stats/matches")
+async def stats_matches(request: Request) -> Dict[str, Any]:
+    # Record a batch of real or simulated results and update Elo ratings
+    data = await read_json(request)
+    matches = data.get("matches") or []
+    try:
+        # A locked database can hold the connection for its full timeout
+        rows, recorded = await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(record_match_results, matches, source=data.get("source", "real")))
+    except (sqlite3.Error, KeyError, TypeError, ValueError) as e:
+        return {"error": str(e)}
+    return {"recorded": recorded, "skipped": len(matches) - recorded, "players": rows}
+
+
+@app.get("/stats/players")
+def stats_players(ids: str = "") -> Dict[str, Any]:
+    player_ids = [p.strip() for p in ids.split(",") if p.strip()]
+    try:
+        return {"players": stats_store.load(player_ids)}
+    except sqlite3.Error as e:
+        return {"error": str(e)}
+
+
+# Server-side tournament sessions: the bracket lives here and each step
+# returns only the matches it changed
+MAX_SESSIONS = int(os.environ.get("FOOTBOT_MAX_SESSIONS", 1000))
+SESSION_TTL = float(os.environ.get("FOOTBOT_SESSION_TTL", 6 * 3600))
+
+
+class TournamentSession:
+    # Matches are dicts keyed by matchId. A side is {"team": i} once known,
+    # {"winnerOf": matchId} while waiting on an earlier match, or {"bye": True}.
+    # `feeds` maps a knockout match to the (matchId, side) its winner fills.
+    # `pending` counts unsettled matches per round and `round_ptr` is the
+    # first round that may still have some, so finding it is constant work.
+    __slots__ = ("id", "kind", "names", "strengths", "matches", "rounds", "pending", "round_ptr", "feeds",
+                 "table", "rng", "touched")
+
+    def __init__(self, kind: str, teams: List[Dict[str, Any]], seed: Optional[int] = None) -> None:
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.names = [t.get("name") or f"Team {i + 1}" for i, t in enumerate(teams)]
+        self.strengths = team_strengths(teams)
+        self.matches: Dict[int, Dict[str, Any]] = {}
+        self.rounds: List[List[int]] = []
+        self.pending: List[int] = []
+        self.round_ptr = 0
+        self.feeds: Dict[int, Tuple[int, str]] = {}
+        self.table = [{"played": 0, "won": 0, "drawn": 0, "lost": 0, "goals_for": 0, "goals_against": 0, "points": 0}
+                      for _ in teams] if kind == "league" else None
+        self.rng = random.Random(seed)
+        self.touched = time.monotonic()
+
+    def add_match(self, rnd: int, a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+        match = {"matchId": len(self.matches) + 1, "round": rnd, "teamA": a, "teamB": b,
+                 "status": "pending", "score": None, "winner": None}
+        self.matches[match["matchId"]] = match
+        while len(self.rounds) <= rnd:
+            self.rounds.append([])
+            self.pending.append(0)
+        self.rounds[rnd].append(match["matchId"])
+        self.pending[rnd] += 1
+        return match
+
+    def settle(self, match: Dict[str, Any], status: str) -> None:
+        match["status"] = status
+        self.pending[match["round"]] -= 1
+
+    def ready(self, match: Dict[str, Any]) -> bool:
+        return match["status"] == "pending" and "team" in match["teamA"] and "team" in match["teamB"]
+
+    def complete(self, match: Dict[str, Any], winner: Optional[Dict[str, Any]], changed: Dict[int, Dict[str, Any]]) -> None:
+        # Record a knockout winner and push it into the match it feeds,
+        # settling walkovers (a team against a BYE) on the way
+        match["winner"] = winner["team"] if winner and "team" in winner else None
+        changed[match["matchId"]] = match
+        target = self.feeds.get(match["matchId"])
+        if target is None:
+            return
+        nxt = self.matches[target[0]]
+        nxt[target[1]] = winner if winner else {"bye": True}
+        changed[nxt["matchId"]] = nxt
+        a, b = nxt["teamA"], nxt["teamB"]
+        if "winnerOf" in a or "winnerOf" in b:
+            return
+        if "bye" in a or "bye" in b:
+            self.settle(nxt, "walkover")
+            self.complete(nxt, b if "bye" in a else a, changed)
+
+    def play(self, match: Dict[str, Any], changed: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+        a = match["teamA"]["team"]
+        b = match["teamB"]["team"]
+        strA, strB = self.strengths[a], self.strengths[b]
+        expA, expB = goal_rates(strA, strB)
+        goalsA = poisson_sample(expA, self.rng)
+        goalsB = poisson_sample(expB, self.rng)
+        res = match_result(strA, strB, expA, expB, goalsA, goalsB)
+        self.settle(match, "played")
+        match["score"] = {"teamA": goalsA, "teamB": goalsB}
+        if self.table is not None:
+            for t, gf, ga in ((a, goalsA, goalsB), (b, goalsB, goalsA)):
+                row = self.table[t]
+                row["played"] += 1
+                row["goals_for"] += gf
+                row["goals_against"] += ga
+                if gf > ga:
+                    row["won"] += 1
+                    row["points"] += 3
+                elif gf == ga:
+                    row["drawn"] += 1
+                    row["points"] += 1
+                else:
+                    row["lost"] += 1
+            match["winner"] = a if goalsA > goalsB else (b if goalsB > goalsA else None)
+            changed[match["matchId"]] = match
+            return res
+        a_wins = goalsA > goalsB
+        if goalsA == goalsB:
+            # Level after full time: a shootout weighted by the strength edge
+            match["penalties"] = True
+            a_wins = self.rng.random() < res["win_probability"]["teamA"]
+        self.complete(match, match["teamA"] if a_wins else match["teamB"], changed)
+        return res
+
+    def current_round(self) -> Optional[int]:
+        # Rounds only ever drain, so the pointer never moves back
+        while self.round_ptr < len(self.pending) and not self.pending[self.round_ptr]:
+            self.round_ptr += 1
+        return self.round_ptr if self.round_ptr < len(self.pending) else None
+
+    def champion(self) -> Optional[int]:
+        if self.kind == "league":
+            if self.current_round() is not None:
+                return None
+            return max(range(len(self.table)), key=lambda t: (self.table[t]["points"],
+                       self.table[t]["goals_for"] - self.table[t]["goals_against"], self.table[t]["goals_for"]))
+        final = self.matches[self.rounds[-1][0]] if self.rounds else None
+        return final["winner"] if final else None
+
+    def state(self) -> Dict[str, Any]:
+        out = {"id": self.id, "tournamentType": "knockout" if self.kind == "knockout" else "round-robin",
+               "teams": [{"team": i, "name": self.names[i], "strength": self.strengths[i]} for i in range(len(self.names))],
+               "rounds": [[self.matches[m] for m in ids] for ids in self.rounds],
+               "currentRound": self.current_round(), "champion": self.champion()}
+        if self.table is not None:
+            out["table"] = self.table
+        return out
+
+
+def build_knockout_session(session: TournamentSession, slots: Optional[List[int]]) -> None:
+    n = len(session.names)
+    if slots is None:
+        order = list(range(n))
+        session.rng.shuffle(order)
+        pow2 = 1
+        while pow2 < n:
+            pow2 <<= 1
+        slots = order + [-1] * (pow2 - n)
+    side = lambda t: {"team": t} if t >= 0 else {"bye": True}
+    prev = [session.add_match(0, side(slots[i]), side(slots[i + 1]))["matchId"] for i in range(0, len(slots), 2)]
+    rnd = 0
+    while len(prev) > 1:
+        rnd += 1
+        cur = []
+        for i in range(0, len(prev), 2):
+            m = session.add_match(rnd, {"winnerOf": prev[i]}, {"winnerOf": prev[i + 1]})
+            session.feeds[prev[i]] = (m["matchId"], "teamA")
+            session.feeds[prev[i + 1]] = (m["matchId"], "teamB")
+            cur.append(m["matchId"])
+        prev = cur
+    # Settle first-round BYEs up front
+    changed: Dict[int, Dict[str, Any]] = {}
+    for mid in session.rounds[0]:
+        m = session.matches[mid]
+        a, b = m["teamA"], m["teamB"]
+        if "bye" in a or "bye" in b:
+            session.settle(m, "walkover")
+            session.complete(m, None if "bye" in a and "bye" in b else (b if "bye" in a else a), changed)
+
+
+def build_league_session(session: TournamentSession, double: bool = False) -> None:
+    # One session round per matchday
+    for day, fixtures in iter_round_robin(len(session.names), double):
+        for home, away in fixtures:
+            session.add_match(day, {"team": home}, {"team": away})
+
+
+tournament_sessions: "OrderedDict[str, TournamentSession]" = OrderedDict()
+
+
+def get_session(session_id: str) -> Optional[TournamentSession]:
+    now = time.monotonic()
+    while tournament_sessions:
+        oldest = next(iter(tournament_sessions.values()))
+        if oldest.touched + SESSION_TTL >= now:
+            break
+        tournament_sessions.popitem(last=False)
+    session = tournament_sessions.get(session_id)
+    if session is not None:
+        session.touched = now
+        tournament_sessions.move_to_end(session_id)
+    return session
+
+
+def step_response(session: TournamentSession, changed: Dict[int, Dict[str, Any]], results: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+    out = {"changed": list(changed.values()), "results": {str(k): v for k, v in results.items()},
+           "currentRound": session.current_round(), "champion": session.champion()}
+    if session.table is not None:
+        # Only the rows of teams that just played
+        touched = {m["teamA"]["team"] for m in changed.values()} | {m["teamB"]["team"] for m in changed.values()}
+        out["table"] = {str(t): session.table[t] for t in sorted(touched)}
+    return out
+
+
+@app.post("/tournaments")
+async def create_tournament(request: Request) -> Any:
+    data = expand_teams(await read_json(request))
+    if isinstance(data, Response):
+        return data
+    teams = data.get("teams") or []
+    if len(teams) < 2:
+        return JSONResponse({"error": "need at least two teams"}, status_code=400)
+    kind = "knockout" if data.get("tournamentType") == "knockout" else "league"
+
+    def build() -> TournamentSession:
+        # Stats lookup and fixture list are built off the loop
+        session = TournamentSession(kind, teams, request_seed(data))
+        if kind == "knockout":
+            build_knockout_session(session, knockout_slots(data.get("bracket"), len(teams)))
+        else:
+            build_league_session(session, bool(data.get("double")))
+        return session
+
+    session = await asyncio.get_running_loop().run_in_executor(None, build)
+    tournament_sessions[session.id] = session
+    while len(tournament_sessions) > MAX_SESSIONS:
+        tournament_sessions.popitem(last=False)
+    return session.state()
+
+
+@app.get("/tournaments/{session_id}")
+async def get_tournament(session_id: str) -> Any:
+    session = get_session(session_id)
+    if session is None:
+        return JSONResponse({"error": "unknown tournament"}, status_code=404)
+    return session.state()
+
+
+@app.delete("/tournaments/{session_id}")
+async def delete_tournament(session_id: str) -> Dict[str, Any]:
+    return {"deleted": tournament_sessions.pop(session_id, None) is not None}
+
+
+@app.post("/tournaments/{session_id}/matches/{match_id}/simulate")
+async def simulate_tournament_match(session_id: str, match_id: int) -> Any:
+    session = get_session(session_id)
+    if session is None:
+        return JSONResponse({"error": "unknown tournament"}, status_code=404)
+    match = session.matches.get(match_id)
+    if match is None:
+        return JSONResponse({"error": "unknown match"}, status_code=404)
+    if not session.ready(match):
+        return JSONResponse({"error": "match is not ready to be played", "match": match}, status_code=409)
+    changed: Dict[int, Dict[str, Any]] = {}
+    results = {match_id: session.play(match, changed)}
+    return step_response(session, changed, results)
+
+
+@app.post("/tournaments/{session_id}/round/simulate")
+async def simulate_tournament_round(session_id: str) -> Any:
+    session = get_session(session_id)
+    if session is None:
+        return JSONResponse({"error": "unknown tournament"}, status_code=404)
+    changed: Dict[int, Dict[str, Any]] = {}
+    results: Dict[int, Dict[str, Any]] = {}
+    rnd = session.current_round()
+    if rnd is not None:
+        for mid in session.rounds[rnd]:
+            match = session.matches[mid]
+            if session.ready(match):
+                results[mid] = session.play(match, changed)
+    return step_response(session, changed, results)
+
+
+@app.post("/tournaments/{session_id}/simulate")
+async def simulate_tournament_rest(session_id: str) -> Any:
+    session = get_session(session_id)
+    if session is None:
+        return JSONResponse({"error": "unknown tournament"}, status_code=404)
+    changed: Dict[int, Dict[str, Any]] = {}
+    results: Dict[int, Dict[str, Any]] = {}
+    # Rounds before the current one are already settled
+    start = session.current_round()
+    for ids in session.rounds[len(session.rounds) if start is None else start:]:
+        for mid in ids:
+            match = session.matches[mid]
+            if session.ready(match):
+                results[mid] = session.play(match, changed)
+    return step_response(session, changed, results)
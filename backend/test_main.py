@@ -0,0 +1,360 @@
+import asyncio
+import os
+import random
+import sys
+import tempfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Keep the stats store out of the working tree
+os.environ.setdefault("FOOTBOT_DB", os.path.join(tempfile.gettempdir(), "footbot-test.db"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import main  # noqa: E402
+
+
+def make_players(n, rng, fractional=False):
+    players = []
+    for i in range(n):
+        p = {"name": f"P{i}", "position": rng.choice(main.positions), "level": rng.choice(list(main.score_map))}
+        if fractional:
+            p["rating"] = round(rng.uniform(0.5, 3.5), 3)
+        players.append(p)
+    return players
+
+
+@pytest.mark.parametrize("n,team_count,fractional", [(1, 1, False), (7, 3, False), (40, 4, True), (101, 8, False), (60, 12, True)])
+def test_fitness_batch_matches_scalar(n, team_count, fractional):
+    rng = random.Random(n * 31 + team_count)
+    players = make_players(n, rng, fractional)
+    pool = main.PlayerPool(players)
+    # Uneven and empty teams included: assignments are drawn freely
+    population = [[rng.randrange(team_count) for _ in range(n)] for _ in range(25)]
+    batch = main.fitness_formation_batch(population, pool.rating, pool.pos, team_count)
+    assert batch.shape == (len(population),)
+    for team_of, got in zip(population, batch):
+        teams = [[] for _ in range(team_count)]
+        for i, t in enumerate(team_of):
+            teams[t].append(players[i])
+        assert got == pytest.approx(main.fitness_formation(teams), abs=1e-9)
+
+
+def reshuffle_baseline(players, team_count, generations, rng):
+    # The random-restart split local search replaced: deal a fresh shuffle
+    # round-robin `generations` times and keep the best
+    best = float("inf")
+    order = list(players)
+    for _ in range(generations):
+        rng.shuffle(order)
+        teams = [order[t::team_count] for t in range(team_count)]
+        best = min(best, main.fitness_formation(teams))
+    return best
+
+
+@pytest.mark.parametrize("n,team_count", [(20, 2), (55, 4), (120, 6), (500, 10)])
+def test_local_search_not_worse_than_reshuffles(n, team_count):
+    generations = 30
+    rng = random.Random(n)
+    players = make_players(n, rng, fractional=True)
+    pool = main.PlayerPool(players)
+    members = main.optimise_split(pool, team_count, generations=generations, rng=random.Random(1))
+    assert sorted(i for m in members for i in m) == list(range(n))
+    got = main.fitness_formation(pool.rebuild(members))
+    assert got <= reshuffle_baseline(players, team_count, generations, random.Random(2)) + 1e-9
+
+
+def fixtures_by_day(team_count, double):
+    return [fixtures for _, fixtures in main.iter_round_robin(team_count, double)]
+
+
+@pytest.mark.parametrize("team_count", range(2, 41))
+@pytest.mark.parametrize("double", [False, True])
+def test_round_robin_invariants(team_count, double):
+    days = fixtures_by_day(team_count, double)
+    assert len(days) == main.matchday_count(team_count, double)
+    met = {}
+    venues = {t: [] for t in range(team_count)}
+    for fixtures in days:
+        playing = [t for pair in fixtures for t in pair]
+        # Nobody plays twice on a matchday
+        assert len(playing) == len(set(playing))
+        for home, away in fixtures:
+            assert home != away
+            key = (home, away) if double else tuple(sorted((home, away)))
+            met[key] = met.get(key, 0) + 1
+            venues[home].append("H")
+            venues[away].append("A")
+    # Every pair meets exactly once (once at each venue in a double)
+    expected = team_count * (team_count - 1) // (1 if double else 2)
+    assert len(met) == expected
+    assert set(met.values()) == {1}
+    for seq in venues.values():
+        assert abs(seq.count("H") - seq.count("A")) <= (0 if double else 1)
+        if team_count > 2:
+            assert "HHH" not in "".join(seq) and "AAA" not in "".join(seq)
+
+
+def test_round_robin_matches_materialised_schedule():
+    teams = [{"name": f"T{i}"} for i in range(9)]
+    flat = [(m["matchday"] - 1, m["teamA"], m["teamB"]) for m in main.create_schedule_list(teams, double=True)]
+    lazy = [(day, h, a) for day, fixtures in main.iter_round_robin(9, True) for h, a in fixtures]
+    assert flat == lazy
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_result_cache_coalesces_identical_requests():
+    cache = main.ResultCache(8, 60.0, 1 << 20)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return b"body"
+
+    async def go():
+        return await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(5)))
+
+    assert run(go()) == [b"body"] * 5
+    assert len(calls) == 1
+    # Later calls are served from the cache
+    assert run(cache.get_or_compute("k", compute)) == b"body"
+    assert len(calls) == 1
+
+
+def test_result_cache_cancelled_leader_does_not_strand_followers():
+    cache = main.ResultCache(8, 60.0, 1 << 20)
+    release = None
+
+    async def compute():
+        await release.wait()
+        return b"done"
+
+    async def go():
+        nonlocal release
+        release = asyncio.Event()
+        leader = asyncio.ensure_future(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.wait_for(follower, 1.0), leader.cancelled()
+
+    assert run(go()) == (b"done", True)
+    assert cache.get("k") == b"done"
+
+
+def test_result_cache_does_not_keep_failures():
+    cache = main.ResultCache(8, 60.0, 1 << 20)
+    attempts = []
+
+    async def compute():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ValueError("boom")
+        return b"ok"
+
+    with pytest.raises(ValueError):
+        run(cache.get_or_compute("k", compute))
+    assert cache.get("k") is None
+    assert run(cache.get_or_compute("k", compute)) == b"ok"
+
+
+def test_result_cache_ttl_and_budgets(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(main.time, "monotonic", lambda: now[0])
+    cache = main.ResultCache(2, 10.0, 10)
+    cache.put("a", b"1234")
+    now[0] += 11
+    assert cache.get("a") is None and cache.bytes == 0
+
+    cache.put("a", b"1234")
+    cache.put("b", b"1234")
+    cache.get("a")
+    cache.put("c", b"12")
+    # Entry cap evicts the least recently used
+    assert cache.get("b") is None and cache.get("a") == b"1234" and cache.get("c") == b"12"
+    cache.put("d", b"123456")
+    # Byte budget: 4 + 2 + 6 > 10
+    assert cache.bytes <= 10 and cache.get("d") == b"123456"
+    cache.put("huge", b"x" * 11)
+    assert cache.get("huge") is None
+
+
+def session_teams(n):
+    return [{"name": f"T{i}", "players": [{"name": f"P{i}-{j}", "position": main.positions[j % 4], "level": "Intermediate"}
+                                          for j in range(4)]} for i in range(n)]
+
+
+def test_knockout_session_settles_byes_and_advances():
+    client = TestClient(main.app)
+    state = client.post("/tournaments", json={"teams": session_teams(5), "tournamentType": "knockout", "seed": 4}).json()
+    rounds = state["rounds"]
+    assert [len(r) for r in rounds] == [4, 2, 1]
+    # 5 teams in 8 slots: BYEs pad the end, so one team gets a BYE and two
+    # BYEs meet. Both walkovers, and the one they feed, are settled up front.
+    walkovers = [m for r in rounds for m in r if m["status"] == "walkover"]
+    assert [m["round"] for m in walkovers] == [0, 0, 1]
+    assert sorted(m["winner"] is None for m in walkovers) == [False, False, True]
+    assert "team" in rounds[2][0]["teamB"]
+    assert state["currentRound"] == 0 and state["champion"] is None
+
+    session_id = state["id"]
+    pending = next(m for m in rounds[1] if m["status"] == "pending" and not ("team" in m["teamA"] and "team" in m["teamB"]))
+    res = client.post(f"/tournaments/{session_id}/matches/{pending['matchId']}/simulate")
+    assert res.status_code == 409
+
+    seen = [state["currentRound"]]
+    while True:
+        step = client.post(f"/tournaments/{session_id}/round/simulate").json()
+        assert step["changed"]
+        seen.append(step["currentRound"])
+        if step["currentRound"] is None:
+            break
+    assert seen == [0, 1, 2, None]
+    final = client.get(f"/tournaments/{session_id}").json()
+    assert all(m["status"] in ("played", "walkover") for r in final["rounds"] for m in r)
+    assert final["champion"] == final["rounds"][-1][0]["winner"] == step["champion"]
+    # Nothing left to play
+    assert client.post(f"/tournaments/{session_id}/simulate").json()["changed"] == []
+
+
+def test_league_session_plays_out_and_is_reproducible():
+    client = TestClient(main.app)
+    champions = []
+    for _ in range(2):
+        state = client.post("/tournaments", json={"teams": session_teams(5), "seed": 9}).json()
+        assert len(state["rounds"]) == main.matchday_count(5)
+        client.post(f"/tournaments/{state['id']}/round/simulate")
+        rest = client.post(f"/tournaments/{state['id']}/simulate").json()
+        assert rest["currentRound"] is None
+        final = client.get(f"/tournaments/{state['id']}").json()
+        assert [row["played"] for row in final["table"]] == [4] * 5
+        assert sum(row["points"] for row in final["table"]) >= 2 * 10
+        champions.append((final["champion"], final["table"]))
+    assert champions[0] == champions[1]
+
+
+def test_generate_pages_large_league_schedules(monkeypatch):
+    monkeypatch.setattr(main, "GENERATE_EXECUTOR", "thread")
+    monkeypatch.setattr(main, "_generate_pool", None)
+    client = TestClient(main.app)
+    rng = random.Random(5)
+    players = make_players(300, rng)
+    team_count = main.GENERATE_SCHEDULE_TEAMS + 6
+    out = client.post("/generate", json={"players": players, "teamCount": team_count, "seed": 1}).json()
+    page = out["schedulePage"]
+    assert page["matchdays"] == main.matchday_count(team_count) and page["nextPage"] == 1
+    first = client.get(f"/schedule?teamCount={team_count}&pageSize={page['pageSize']}").json()
+    assert out["schedule"] == [dict(f, matchday=d["matchday"]) for d in first["items"] for f in d["fixtures"]]
+
+    skipped = client.post("/generate", json={"players": players, "teamCount": 4, "seed": 1, "schedule": False}).json()
+    assert skipped["schedule"] == [] and "schedulePage" not in skipped
+    assert client.post("/generate", json={"players": players, "teamCount": main.MAX_SCHEDULE_TEAMS + 1}).status_code == 400
+    main._generate_pool.shutdown()
+
+
+def rebalance_fixture(n, team_count, seed):
+    rng = random.Random(seed)
+    players = make_players(n, rng, fractional=True)
+    for i, p in enumerate(players):
+        p["id"] = f"id{i}"
+    pool = main.PlayerPool(players)
+    members = main.optimise_split(pool, team_count, generations=5, rng=random.Random(seed))
+    teams = []
+    for t, m in enumerate(members):
+        team_players = [dict(p) for p in pool.rebuild([m])[0]]
+        team_players[0]["captain"] = True
+        teams.append({"name": f"T{t}", "players": team_players})
+    return teams, rng
+
+
+def test_rebalance_matches_dropouts_by_id_or_name():
+    teams, _ = rebalance_fixture(40, 4, 1)
+    names = [p["name"] for p in teams[1]["players"]]
+    ids = [p["id"] for p in teams[2]["players"]]
+    removed = [names[1], {"name": names[2]}, ids[1], {"id": ids[2], "name": "someone else"}, "nobody", {"name": "nobody"}]
+    out = main.rebalance_teams(teams, [], removed)
+    assert out["unknown"] == ["nobody", {"name": "nobody"}]
+    assert sorted(out["removed"]) == sorted([teams[1]["players"][1]["id"], teams[1]["players"][2]["id"], ids[1], ids[2]])
+    left = {p["id"] for t in out["teams"] for p in t["players"]}
+    assert len(left) == 36 and not left & set(out["removed"])
+    # Removing the same name twice only matches one player
+    again = main.rebalance_teams(teams, [], [names[1], names[1]])
+    assert len(again["removed"]) == 1 and again["unknown"] == [names[1]]
+
+
+@pytest.mark.parametrize("n,team_count,k", [(60, 4, 3), (400, 24, 20), (1200, 60, 40)])
+def test_rebalance_keeps_captains_and_consistent_fitness(n, team_count, k):
+    teams, rng = rebalance_fixture(n, team_count, n)
+    everyone = [p for t in teams for p in t["players"]]
+    added = [dict(p, id=f"new{i}", name=f"New{i}", captain=False) for i, p in enumerate(make_players(k, rng, fractional=True))]
+    removed = [p["id"] for p in rng.sample(everyone, k)]
+    out = main.rebalance_teams(teams, added, removed, max_moves=30)
+
+    assert len(out["moves"]) <= 30
+    final = [t["players"] for t in out["teams"]]
+    assert out["fitness"]["after"] == pytest.approx(main.fitness_formation(final), abs=1e-6)
+    assert sorted(p["id"] for t in final for p in t) == sorted({p["id"] for p in everyone} - set(removed) | {p["id"] for p in added})
+    home = {p["id"]: t for t, team in enumerate(teams) for p in team["players"]}
+    captains = {team["players"][0]["id"] for team in teams}
+    for t, team in enumerate(final):
+        # Captains never move, and every team keeps (or gets) one
+        assert any(p.get("captain") for p in team)
+        assert all(home[p["id"]] == t for p in team if p["id"] in captains)
+    for move in out["moves"]:
+        assert home[move["player"]] == move["from"] != move["to"]
+        assert move["player"] not in captains
+
+
+def test_rebalance_split_keeps_candidate_index_in_sync():
+    rng = random.Random(11)
+    levels = [rng.uniform(0.5, 3.5) for _ in range(900)]
+    pos = [rng.randrange(4) for _ in range(900)]
+    # A deliberately lopsided start so the search makes plenty of moves
+    team_of = [min(i // 20, 29) if rng.random() < 0.7 else rng.randrange(30) for i in range(900)]
+    state = main.SplitState(levels, pos, team_of, 30)
+    start = state.total
+    index = main.CandidateIndex(state)
+    moved = main.rebalance_split(state, [True] * 900, 80, min_gain=0.0, index=index)
+    assert 0 < moved <= 80 and state.total < start
+    fresh = main.CandidateIndex(state)
+    assert index.orders == fresh.orders and index.candidates() == fresh.candidates()
+    # Incremental bookkeeping agrees with a state built from scratch
+    assert state.total == pytest.approx(main.SplitState(levels, pos, list(state.team_of), 30).total, abs=1e-6)
+
+
+def test_rebalance_endpoint_requires_teams():
+    client = TestClient(main.app)
+    assert client.post("/rebalance", json={}).status_code == 400
+
+
+def test_islands_share_the_step_budget(monkeypatch):
+    monkeypatch.setattr(main, "ISLAND_WORKERS", 1)
+    pool = main.PlayerPool(make_players(80, random.Random(4)))
+    islands = {}
+    members = main.optimise_split_islands(pool, 4, 4, generations=20, rng=random.Random(1), stats=islands)
+    assert sorted(i for m in members for i in m) == list(range(80))
+    assert islands["steps"] <= 20 * 80
+    again = main.optimise_split_islands(pool, 4, 4, generations=20, rng=random.Random(1))
+    assert again == members
+
+
+def test_island_requests_use_their_own_pool(monkeypatch):
+    monkeypatch.setattr(main, "ISLAND_WORKERS", 0)
+    monkeypatch.setattr(main.os, "cpu_count", lambda: 8)
+    assert main.island_workers(4) == 4 and main.island_workers(16) == 8
+    monkeypatch.setattr(main, "GENERATE_EXECUTOR", "thread")
+    monkeypatch.setattr(main, "ISLAND_WORKERS", 1)
+    monkeypatch.setattr(main, "_generate_pool", None)
+    monkeypatch.setattr(main, "_island_pool", None)
+    client = TestClient(main.app)
+    players = make_players(40, random.Random(6))
+    assert client.post("/generate", json={"players": players, "teamCount": 4, "seed": 1, "islands": 3}).status_code == 200
+    assert main._island_pool is not None and main._generate_pool is None
+    main._island_pool.shutdown()